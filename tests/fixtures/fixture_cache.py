@@ -0,0 +1,15 @@
+import pytest
+from core.testing import temporary_cache
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_configure(config):
+    # Раньше сбора тестов: модули с cache на уровне импорта создают
+    # бэкенд уже при сборе, и рабочий каталог кеша не должен появиться
+    config.temporary_cache = temporary_cache()
+    config.temporary_cache.__enter__()
+
+
+def pytest_unconfigure(config):
+    if hasattr(config, 'temporary_cache'):
+        config.temporary_cache.__exit__(None, None, None)
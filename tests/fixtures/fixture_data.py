@@ -12,6 +12,12 @@ def mock_media(settings):
         yield temp_directory
 
 
+@pytest.fixture(autouse=True)
+def inline_thumbnails(settings):
+    """Миниатюры строятся в потоке теста, а не в фоне после его завершения."""
+    settings.THUMBNAIL_WORKERS = 0
+
+
 @pytest.fixture
 def mixer():
     return _mixer
@@ -0,0 +1,32 @@
+import pytest
+from core.testing import assert_max_queries
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'max_queries(limit): бюджет SQL-запросов для фикстуры max_queries'
+    )
+
+
+@pytest.fixture
+def max_queries(request):
+    """
+    Контекстный менеджер с бюджетом запросов:
+
+        @pytest.mark.max_queries(6)
+        def test_index(client, max_queries):
+            with max_queries():
+                client.get('/')
+
+    Лимит берётся из маркера или передаётся явно: max_queries(4).
+    """
+    marker = request.node.get_closest_marker('max_queries')
+    default = marker.args[0] if marker else None
+
+    def check(limit=default, **kwargs):
+        assert limit is not None, (
+            'Укажите лимит в маркере max_queries или в вызове фикстуры'
+        )
+        return assert_max_queries(limit, **kwargs)
+    return check
@@ -0,0 +1,51 @@
+import pytest
+from posts.feed_cache import bump_feed_version
+
+
+@pytest.mark.django_db
+class TestQueryBudget:
+
+    def get(self, client, max_queries, url):
+        # Первый запрос заводит счётчики ленты и наполняет кеш sorl,
+        # новая версия ленты сбрасывает закешированный фрагмент главной
+        client.get(url)
+        bump_feed_version()
+        with max_queries():
+            response = client.get(url)
+        assert response.status_code == 200
+        return response
+
+    @pytest.mark.max_queries(6)
+    def test_index(self, user_client, few_posts_with_group, max_queries):
+        self.get(user_client, max_queries, '/')
+
+    @pytest.mark.max_queries(6)
+    def test_group_posts(self, user_client, few_posts_with_group, max_queries):
+        self.get(
+            user_client, max_queries,
+            f'/group/{few_posts_with_group.group.slug}/'
+        )
+
+    # Профиль проверяет подписку, а упоминания страницы — ещё один запрос
+    @pytest.mark.max_queries(7)
+    def test_profile(self, user_client, few_posts_with_group, max_queries):
+        self.get(
+            user_client, max_queries,
+            f'/profile/{few_posts_with_group.author.username}/'
+        )
+
+    @pytest.mark.max_queries(6)
+    def test_post_detail(self, user_client, post, max_queries):
+        self.get(user_client, max_queries, f'/posts/{post.id}/')
+
+    @pytest.mark.max_queries(6)
+    def test_follow_index(self, user_client, another_few_posts_with_group_with_follower, max_queries):
+        self.get(user_client, max_queries, '/follow/')
+
+    def test_n_plus_one_is_reported(self, few_posts_with_group, max_queries):
+        from posts.models import Post
+
+        with pytest.raises(AssertionError, match='n\\+1'):
+            with max_queries(100):
+                for post in Post.objects.all()[:10]:
+                    post.author.username
@@ -0,0 +1,295 @@
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.utils.module_loading import import_string
+
+from . import metrics
+
+_missing = object()
+
+
+class InstrumentedCache(BaseCache):
+    """
+    Обёртка над другим бэкендом кеша, считающая попадания и промахи.
+
+    Настоящий бэкенд задаётся ключом WRAPS, остальные параметры
+    передаются ему без изменений:
+
+        'default': {
+            'BACKEND': 'core.cache.InstrumentedCache',
+            'WRAPS': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-snowflake',
+        }
+    """
+
+    def __init__(self, location, params):
+        params = dict(params)
+        backend = import_string(params.pop('WRAPS'))
+        super().__init__(params)
+        self.cache = backend(location, params)
+
+    def _count(self, hits, misses):
+        request_metrics = metrics.current()
+        if request_metrics is not None:
+            request_metrics.cache_hits += hits
+            request_metrics.cache_misses += misses
+
+    def get(self, key, default=None, version=None):
+        value = self.cache.get(key, _missing, version=version)
+        if value is _missing:
+            self._count(0, 1)
+            return default
+        self._count(1, 0)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = self.cache.get_many(keys, version=version)
+        self._count(len(values), len(keys) - len(values))
+        return values
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.cache.add(key, value, timeout, version=version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.cache.set(key, value, timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.cache.set_many(data, timeout, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.cache.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        return self.cache.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        return self.cache.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        return self.cache.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        return self.cache.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        return self.cache.decr(key, delta, version=version)
+
+    def clear(self):
+        return self.cache.clear()
+
+    def close(self, **kwargs):
+        return self.cache.close(**kwargs)
+
+
+class TieredCache(BaseCache):
+    """
+    Двухуровневый кеш: LRU в памяти процесса поверх общего бэкенда.
+
+    Общий бэкенд задаётся ключом SHARED и получает остальные параметры.
+    Локальный уровень настраивается ключом LOCAL: MAX_ENTRIES — сколько
+    ключей держать, TIMEOUT — сколько секунд верить копии, BYPASS —
+    начала ключей, которые всегда читаются из общего бэкенда. Через
+    BYPASS идут ключи версий вроде feed_version: сброс версии сразу
+    видят все процессы, а устаревшие копии с прошлой версией в ключе
+    больше никто не запросит.
+
+        'default': {
+            'BACKEND': 'core.cache.TieredCache',
+            'SHARED': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': '/var/tmp/yatube-cache',
+            'LOCAL': {'MAX_ENTRIES': 1000, 'TIMEOUT': 5,
+                      'BYPASS': ['feed_version']},
+        }
+    """
+
+    def __init__(self, location, params):
+        params = dict(params)
+        backend = import_string(params.pop('SHARED'))
+        local = params.pop('LOCAL', {})
+        super().__init__(params)
+        self.shared = backend(location, params)
+        self.local_max_entries = local.get('MAX_ENTRIES', 1000)
+        self.local_timeout = local.get('TIMEOUT', 5)
+        self.bypass = tuple(local.get('BYPASS', ()))
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _record(tier, hit):
+        metrics.registry.inc(
+            'yatube_cache_tier_hits_total' if hit
+            else 'yatube_cache_tier_misses_total',
+            tier=tier,
+        )
+
+    def _local_key(self, key, version):
+        if key.startswith(self.bypass):
+            return None
+        return self.make_key(key, version=version)
+
+    def _local_get(self, local_key):
+        with self._lock:
+            entry = self._local.get(local_key)
+            if entry is None:
+                return _missing
+            expires, pickled = entry
+            if expires <= time.monotonic():
+                del self._local[local_key]
+                return _missing
+            self._local.move_to_end(local_key)
+        return pickle.loads(pickled)
+
+    def _local_set(self, local_key, value, timeout=DEFAULT_TIMEOUT):
+        if local_key is None:
+            return
+        expires = self.get_backend_timeout(timeout)
+        ttl = self.local_timeout
+        if expires is not None:
+            ttl = min(ttl, expires - time.time())
+        if ttl <= 0:
+            self._local_drop(local_key)
+            return
+        # Копия как в LocMemCache: изменение объекта не портит кеш
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._local[local_key] = (time.monotonic() + ttl, pickled)
+            self._local.move_to_end(local_key)
+            while len(self._local) > self.local_max_entries:
+                self._local.popitem(last=False)
+
+    def _local_drop(self, local_key):
+        if local_key is None:
+            return
+        with self._lock:
+            self._local.pop(local_key, None)
+
+    def get(self, key, default=None, version=None):
+        local_key = self._local_key(key, version)
+        if local_key is not None:
+            value = self._local_get(local_key)
+            self._record('local', value is not _missing)
+            if value is not _missing:
+                return value
+        value = self.shared.get(key, _missing, version=version)
+        self._record('shared', value is not _missing)
+        if value is _missing:
+            return default
+        self._local_set(local_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        values, missed = {}, []
+        for key in keys:
+            local_key = self._local_key(key, version)
+            value = _missing
+            if local_key is not None:
+                value = self._local_get(local_key)
+                self._record('local', value is not _missing)
+            if value is _missing:
+                missed.append(key)
+            else:
+                values[key] = value
+        found = self.shared.get_many(missed, version=version) if missed else {}
+        for key in missed:
+            self._record('shared', key in found)
+        for key, value in found.items():
+            self._local_set(self._local_key(key, version), value)
+        values.update(found)
+        return values
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._local_set(self._local_key(key, version), value, timeout)
+        return added
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._local_set(self._local_key(key, version), value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if key not in failed:
+                self._local_set(self._local_key(key, version), value, timeout)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._local_drop(self._local_key(key, version))
+        return self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        for key in keys:
+            self._local_drop(self._local_key(key, version))
+        return self.shared.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        local_key = self._local_key(key, version)
+        if local_key is not None and (
+            self._local_get(local_key) is not _missing
+        ):
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._local_drop(self._local_key(key, version))
+        return self.shared.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        self._local_drop(self._local_key(key, version))
+        return self.shared.decr(key, delta, version=version)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+        return self.shared.clear()
+
+    def close(self, **kwargs):
+        return self.shared.close(**kwargs)
+
+
+class FileCache(FileBasedCache):
+    """
+    Файловый кеш без уборки при записи.
+
+    FileBasedCache в Django 2.2 перечисляет весь каталог на каждый set(),
+    чтобы сравнить число файлов с MAX_ENTRIES, и при большом лимите каждая
+    запись стоит O(числа записей). Здесь каталог убирает команда
+    cull_cache по расписанию.
+    """
+
+    def _cull(self):
+        pass
+
+    def cull(self):
+        """
+        Удаляет просроченные записи, а сверх MAX_ENTRIES — самые давно
+        записанные. Возвращает число удалённых файлов.
+        """
+        removed = 0
+        alive = []
+        for name in self._list_cache_files():
+            try:
+                with open(name, 'rb') as cache_file:
+                    if self._is_expired(cache_file):
+                        removed += 1
+                        continue
+                alive.append((os.path.getmtime(name), name))
+            except FileNotFoundError:
+                # Файл удалили или перезаписали в другом процессе
+                continue
+        alive.sort()
+        for _, name in alive[:max(0, len(alive) - self._max_entries)]:
+            self._delete(name)
+            removed += 1
+        return removed
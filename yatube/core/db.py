@@ -0,0 +1,22 @@
+"""Настройка соединений с базой сразу после открытия."""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def apply_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute('PRAGMA {} = {}'.format(name, value))
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    WAL пускает читателей параллельно с писателем; synchronous=NORMAL
+    в режиме WAL не теряет целостность при сбое процесса; busy_timeout
+    заставляет ждать блокировку вместо мгновенного «database is locked».
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, settings.SQLITE_PRAGMAS)
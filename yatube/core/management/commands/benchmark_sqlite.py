@@ -0,0 +1,158 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db import apply_pragmas
+from core.metrics import percentile
+
+# Как открывает файл sqlite3 без настроек: журнал отката и полный fsync
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'delete',
+    'synchronous': 'full',
+    'mmap_size': 0,
+    'busy_timeout': 5000,
+}
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, author_id INTEGER, '
+    'text TEXT, pub_date REAL)',
+    'CREATE INDEX post_pub_date ON post (pub_date DESC, id DESC)',
+)
+READ = (
+    'SELECT id, author_id, text, pub_date FROM post '
+    'ORDER BY pub_date DESC, id DESC LIMIT 10'
+)
+WRITE = 'INSERT INTO post (author_id, text, pub_date) VALUES (?, ?, ?)'
+TEXT = 'Benchmark ' * 20
+
+
+class Worker(threading.Thread):
+    def __init__(self, path, pragmas, sql, deadline, barrier):
+        super().__init__()
+        self.path = path
+        self.pragmas = pragmas
+        self.sql = sql
+        self.deadline = deadline
+        self.barrier = barrier
+        self.latencies = []
+        self.errors = 0
+
+    def run(self):
+        # Автокоммит: каждый INSERT — своя транзакция, как post_create
+        db = sqlite3.connect(self.path, isolation_level=None)
+        apply_pragmas(db, self.pragmas)
+        self.barrier.wait()
+        while time.monotonic() < self.deadline[0]:
+            started = time.perf_counter()
+            try:
+                self.query(db)
+            except sqlite3.OperationalError:
+                self.errors += 1
+                continue
+            self.latencies.append((time.perf_counter() - started) * 1000)
+        db.close()
+
+    def query(self, db):
+        if self.sql == READ:
+            db.execute(READ).fetchall()
+        else:
+            db.execute(WRITE, (1, TEXT, time.time()))
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает конкурентные чтения и записи в SQLite с настройками '
+        'по умолчанию и с SQLITE_PRAGMAS. База создаётся во временном '
+        'каталоге.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--rows', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        profiles = (
+            ('default', DEFAULT_PRAGMAS),
+            ('tuned', settings.SQLITE_PRAGMAS),
+        )
+        self.stdout.write(
+            '{:<8} {:>9} {:>9} {:>12} {:>12} {:>12} {:>12} {:>7}'.format(
+                'profile', 'reads/s', 'writes/s',
+                'read p50 ms', 'read p99 ms',
+                'write p50 ms', 'write p99 ms', 'errors',
+            )
+        )
+        for name, pragmas in profiles:
+            readers, writers = self.run(pragmas, options)
+            self.stdout.write(
+                '{:<8} {:>9.0f} {:>9.0f} {:>12.2f} {:>12.2f} {:>12.2f} '
+                '{:>12.2f} {:>7}'.format(
+                    name,
+                    len(readers['latencies']) / options['seconds'],
+                    len(writers['latencies']) / options['seconds'],
+                    *self.percentiles(readers['latencies']),
+                    *self.percentiles(writers['latencies']),
+                    readers['errors'] + writers['errors'],
+                )
+            )
+
+    def run(self, pragmas, options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.sqlite3')
+            self.create(path, pragmas, options['rows'])
+            count = options['readers'] + options['writers']
+            # Отсчёт начинается, когда все потоки открыли соединения
+            deadline = [0]
+            barrier = threading.Barrier(count + 1)
+            workers = [
+                Worker(path, pragmas, READ, deadline, barrier)
+                for _ in range(options['readers'])
+            ] + [
+                Worker(path, pragmas, WRITE, deadline, barrier)
+                for _ in range(options['writers'])
+            ]
+            for worker in workers:
+                worker.start()
+            deadline[0] = time.monotonic() + options['seconds']
+            barrier.wait()
+            for worker in workers:
+                worker.join()
+        return (
+            self.collect(workers[:options['readers']]),
+            self.collect(workers[options['readers']:]),
+        )
+
+    @staticmethod
+    def create(path, pragmas, rows):
+        db = sqlite3.connect(path)
+        apply_pragmas(db, pragmas)
+        for statement in SCHEMA:
+            db.execute(statement)
+        now = time.time()
+        db.executemany(WRITE, (
+            (number % 100, TEXT, now - number) for number in range(rows)
+        ))
+        db.commit()
+        db.close()
+
+    @staticmethod
+    def collect(workers):
+        return {
+            'latencies': [
+                latency for worker in workers for latency in worker.latencies
+            ],
+            'errors': sum(worker.errors for worker in workers),
+        }
+
+    @staticmethod
+    def percentiles(samples):
+        if not samples:
+            return float('nan'), float('nan')
+        return percentile(samples, 50), percentile(samples, 99)
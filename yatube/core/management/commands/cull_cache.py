@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+
+from core.cache import FileCache
+
+
+def file_caches(backend):
+    """Файловые кеши внутри обёрток InstrumentedCache и TieredCache."""
+    if isinstance(backend, FileCache):
+        yield backend
+    for attr in ('cache', 'shared'):
+        inner = getattr(backend, attr, None)
+        if inner is not None:
+            yield from file_caches(inner)
+
+
+class Command(BaseCommand):
+    help = (
+        'Убирает файловый кеш: удаляет просроченные записи и самые '
+        'старые сверх MAX_ENTRIES. Запускается по расписанию, потому что '
+        'core.cache.FileCache не убирает каталог при записи.'
+    )
+
+    def handle(self, *args, **options):
+        removed = sum(
+            backend.cull()
+            for alias in settings.CACHES
+            for backend in file_caches(caches[alias])
+        )
+        self.stdout.write('Удалено записей: {}'.format(removed))
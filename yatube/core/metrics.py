@@ -0,0 +1,249 @@
+"""
+Метрики запросов.
+
+Каждый воркер считает свои значения в памяти и не чаще раза
+в METRICS_PUBLISH_INTERVAL кладёт снимок в общий уровень кеша.
+Запрос к /metrics/ попадает в случайный воркер, поэтому страница
+складывает снимки всех живых воркеров: счётчики суммируются, квантили
+считаются по объединённым окнам. Снимок воркера, который давно ничего
+не публиковал, истекает через METRICS_WORKER_TIMEOUT, и его счётчики
+выпадают из суммы — для Prometheus это выглядит как сброс счётчика.
+Квантили считаются по последним METRICS_WINDOW наблюдениям каждого
+воркера, поэтому память на метрику ограничена.
+"""
+import math
+import os
+import socket
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import cache
+
+_local = threading.local()
+
+WORKERS_KEY = 'metrics:workers'
+SNAPSHOT_KEY = 'metrics:worker:{}'
+
+
+def percentile(samples, q):
+    """Перцентиль q (0–100) методом ближайшего ранга."""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class RequestMetrics:
+    """Счётчики одного запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+def start_request():
+    _local.current = RequestMetrics()
+    return _local.current
+
+
+def finish_request():
+    _local.current = None
+
+
+def current():
+    """Метрики текущего запроса или None вне запроса."""
+    return getattr(_local, 'current', None)
+
+
+class Summary:
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.samples.append(value)
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._counters = {}
+        self._summaries = {}
+        self._published = None
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = Summary(
+                    settings.METRICS_WINDOW
+                )
+            summary.observe(value)
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._summaries.clear()
+            self._published = None
+
+    def snapshot(self):
+        """Значения процесса в виде, который можно положить в кеш."""
+        with self._lock:
+            return {
+                'counters': dict(self._counters),
+                'summaries': {
+                    key: (list(summary.samples), summary.sum, summary.count)
+                    for key, summary in self._summaries.items()
+                },
+            }
+
+    def publish(self, force=False):
+        """
+        Кладёт снимок процесса в общий кеш, если с прошлого раза прошло
+        METRICS_PUBLISH_INTERVAL секунд, и записывает воркер в список.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if not force and self._published is not None and (
+                now - self._published < settings.METRICS_PUBLISH_INTERVAL
+            ):
+                return
+            self._published = now
+        worker = '{}:{}'.format(socket.gethostname(), os.getpid())
+        cache.set(
+            SNAPSHOT_KEY.format(worker),
+            self.snapshot(),
+            settings.METRICS_WORKER_TIMEOUT
+        )
+        # Одновременная запись списка может потерять воркер: он
+        # вернётся в список со следующим снимком
+        workers = cache.get(WORKERS_KEY, [])
+        if worker not in workers:
+            cache.set(WORKERS_KEY, workers + [worker], None)
+
+    def collect(self):
+        """Текст /metrics/: снимки всех воркеров, сложенные вместе."""
+        self.publish(force=True)
+        workers = cache.get(WORKERS_KEY, [])
+        snapshots = cache.get_many(
+            [SNAPSHOT_KEY.format(worker) for worker in workers]
+        )
+        alive = [
+            worker for worker in workers
+            if SNAPSHOT_KEY.format(worker) in snapshots
+        ]
+        if alive != workers:
+            cache.set(WORKERS_KEY, alive, None)
+        return self.render(merge(snapshots.values()))
+
+    def render(self, snapshot=None):
+        """
+        Текст в формате экспозиции Prometheus 0.0.4; без снимка —
+        значения одного этого процесса.
+        """
+        if snapshot is None:
+            snapshot = self.snapshot()
+        counters = sorted(snapshot['counters'].items())
+        summaries = sorted(
+            (key, samples, total, count)
+            for key, (samples, total, count)
+            in snapshot['summaries'].items()
+        )
+        lines = []
+        described = set()
+        for (name, labels), value in counters:
+            self._header(lines, described, name, 'counter')
+            lines.append('{}{} {}'.format(name, _labels(labels), value))
+        for (name, labels), samples, total, count in summaries:
+            self._header(lines, described, name, 'summary')
+            for quantile in self.QUANTILES:
+                lines.append('{}{} {}'.format(
+                    name,
+                    _labels(labels + (('quantile', str(quantile)),)),
+                    _number(percentile(samples, quantile * 100)),
+                ))
+            lines.append('{}_sum{} {}'.format(
+                name, _labels(labels), _number(total)
+            ))
+            lines.append('{}_count{} {}'.format(
+                name, _labels(labels), count
+            ))
+        return '\n'.join(lines) + '\n'
+
+    def _header(self, lines, described, name, kind):
+        if name in described:
+            return
+        described.add(name)
+        if name in self._help:
+            lines.append('# HELP {} {}'.format(name, self._help[name]))
+        lines.append('# TYPE {} {}'.format(name, kind))
+
+
+def merge(snapshots):
+    """Складывает снимки воркеров в один."""
+    counters, summaries = {}, {}
+    for snapshot in snapshots:
+        for key, value in snapshot['counters'].items():
+            counters[key] = counters.get(key, 0) + value
+        for key, (samples, total, count) in snapshot['summaries'].items():
+            merged = summaries.setdefault(key, ([], 0.0, 0))
+            summaries[key] = (
+                merged[0] + samples, merged[1] + total, merged[2] + count
+            )
+    return {'counters': counters, 'summaries': summaries}
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'),
+        )
+        for name, value in labels
+    ) + '}'
+
+
+def _number(value):
+    return '{:.3f}'.format(value).rstrip('0').rstrip('.')
+
+
+registry = Registry()
+registry.describe('yatube_requests_total', 'Обработанные запросы.')
+registry.describe(
+    'yatube_request_duration_ms', 'Время ответа представления, мс.'
+)
+registry.describe('yatube_db_queries', 'SQL-запросов на один ответ.')
+registry.describe('yatube_db_duration_ms', 'Время в базе на один ответ, мс.')
+registry.describe(
+    'yatube_template_duration_ms', 'Время рендеринга шаблонов, мс.'
+)
+registry.describe('yatube_cache_hits_total', 'Попадания в кеш.')
+registry.describe('yatube_cache_misses_total', 'Промахи кеша.')
+registry.describe(
+    'yatube_cache_tier_hits_total', 'Попадания по уровням кеша.'
+)
+registry.describe(
+    'yatube_cache_tier_misses_total', 'Промахи по уровням кеша.'
+)
@@ -0,0 +1,205 @@
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics, routers
+from .query_detector import QueryDetector
+
+logger = logging.getLogger('core.query_detector')
+
+
+class QueryCounter:
+    """Обёртка execute_wrapper: число и время SQL-запросов."""
+
+    def __init__(self, request_metrics):
+        self.metrics = request_metrics
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.metrics.queries += 1
+            self.metrics.db_time += time.perf_counter() - started
+
+
+class InstrumentationMiddleware:
+    """
+    Считает SQL-запросы, время в базе, рендеринг шаблонов и обращения
+    к кешу для каждого запроса. Итог уходит в метрики представления
+    для /metrics/, а в заголовок Server-Timing — только с DEBUG или
+    для сотрудников: посторонним незачем видеть устройство сайта.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_metrics = metrics.start_request()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                counter = QueryCounter(request_metrics)
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(counter))
+                response = self.get_response(request)
+        finally:
+            metrics.finish_request()
+        total = time.perf_counter() - started
+        if self.shows_timing(request):
+            response['Server-Timing'] = server_timing(request_metrics, total)
+        self.record(request, request_metrics, total)
+        return response
+
+    @staticmethod
+    def shows_timing(request):
+        if settings.DEBUG:
+            return True
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_staff
+
+    @staticmethod
+    def record(request, request_metrics, total):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        registry = metrics.registry
+        registry.inc('yatube_requests_total', view=view)
+        registry.observe('yatube_request_duration_ms', total * 1000, view=view)
+        registry.observe(
+            'yatube_db_queries', request_metrics.queries, view=view
+        )
+        registry.observe(
+            'yatube_db_duration_ms', request_metrics.db_time * 1000, view=view
+        )
+        registry.observe(
+            'yatube_template_duration_ms',
+            request_metrics.template_time * 1000,
+            view=view
+        )
+        registry.inc(
+            'yatube_cache_hits_total', request_metrics.cache_hits, view=view
+        )
+        registry.inc(
+            'yatube_cache_misses_total',
+            request_metrics.cache_misses,
+            view=view
+        )
+        registry.publish()
+
+
+class QueryDetectorMiddleware:
+    """
+    Пишет в лог N+1, медленные запросы и сортировки без индекса.
+
+    Разбор с его EXPLAIN идёт при закрытии ответа, когда
+    InstrumentationMiddleware уже снял свой счётчик: в Server-Timing
+    и /metrics/ попадают только запросы самого представления.
+    """
+
+    def __init__(self, get_response):
+        if not (settings.DEBUG and settings.QUERY_DETECTOR):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryDetector() as detector:
+            response = self.get_response(request)
+        # Так же FileResponse закрывает свой файл вместе с ответом
+        response._closable_objects.append(ProblemReport(request, detector))
+        return response
+
+
+class ProblemReport:
+    """Разбирает запросы детектора, когда ответ закрывают."""
+
+    def __init__(self, request, detector):
+        self.method = request.method
+        self.path = request.path
+        self.detector = detector
+
+    def close(self):
+        problems = self.detector.problems()
+        if problems:
+            logger.warning(
+                '%s %s\n%s',
+                self.method,
+                self.path,
+                self.detector.report(problems)
+            )
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Отправляет чтение лент на реплику и держит браузер на основной
+    базе после записи: срок приходит в cookie, поэтому его видят
+    все воркеры.
+
+    Запись считается пользовательской, если это изменяющий запрос или
+    любой запрос к представлению вне REPLICA_READ_VIEWS: подписка
+    пишет на GET и уводит на профиль, который читает реплику. Служебные
+    записи самих лент (заведение счётчиков) браузер не закрепляют.
+    """
+
+    COOKIE = 'primary_until'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = routers.start_request(pinned=self.is_pinned(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.finish_request()
+        if state.wrote and (
+            request.method not in ('GET', 'HEAD', 'OPTIONS')
+            or not self.reads_replica(request)
+        ):
+            seconds = settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(
+                self.COOKIE,
+                '{:.3f}'.format(time.time() + seconds),
+                max_age=seconds,
+                httponly=True,
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = routers.current()
+        if (
+            state is not None and settings.DATABASE_REPLICAS
+            and self.reads_replica(request)
+        ):
+            state.replica = random.choice(settings.DATABASE_REPLICAS)
+
+    @staticmethod
+    def reads_replica(request):
+        match = getattr(request, 'resolver_match', None)
+        return match is not None and (
+            match.url_name in settings.REPLICA_READ_VIEWS
+        )
+
+    def is_pinned(self, request):
+        try:
+            until = float(request.COOKIES.get(self.COOKIE, 0))
+        except ValueError:
+            return False
+        return until > time.time()
+
+
+def server_timing(request_metrics, total):
+    return ', '.join((
+        'db;dur={:.1f};desc="{} queries"'.format(
+            request_metrics.db_time * 1000, request_metrics.queries
+        ),
+        'tpl;dur={:.1f}'.format(request_metrics.template_time * 1000),
+        'cache;desc="{} hits, {} misses"'.format(
+            request_metrics.cache_hits, request_metrics.cache_misses
+        ),
+        'total;dur={:.1f}'.format(total * 1000),
+    ))
@@ -0,0 +1,133 @@
+import re
+import time
+from collections import Counter, namedtuple
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+Query = namedtuple('Query', 'alias sql params duration')
+Problem = namedtuple('Problem', 'kind sql detail')
+
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+SORT_MARKERS = {
+    'sqlite': ('USE TEMP B-TREE FOR ORDER BY',),
+    'postgresql': ('Sort Key',),
+}
+
+
+def shape(sql):
+    """Запрос без значений: одинаковые формы — кандидаты в N+1."""
+    return LITERAL.sub('?', IN_LIST.sub('IN (...)', sql))
+
+
+class QueryDetector:
+    """
+    Собирает SQL через execute_wrapper и ищет в нём проблемы.
+
+    N+1 — одна и та же форма SELECT, выполненная repeats раз и больше;
+    медленный запрос — дольше slow_ms; сортировка без индекса — SELECT
+    с ORDER BY, для которого план базы строит отдельную сортировку.
+    """
+
+    def __init__(self, repeats=None, slow_ms=None, explain=True):
+        self.repeats = repeats or settings.QUERY_DETECTOR_REPEATS
+        self.slow_ms = slow_ms or settings.QUERY_DETECTOR_SLOW_MS
+        self.explain = explain
+        self.queries = []
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if not many:
+                self.queries.append(Query(
+                    context['connection'].alias,
+                    sql,
+                    params,
+                    (time.perf_counter() - started) * 1000,
+                ))
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def __len__(self):
+        return len(self.queries)
+
+    def selects(self):
+        return [
+            query for query in self.queries
+            if query.sql.lstrip().upper().startswith('SELECT')
+        ]
+
+    def repeated(self):
+        counts = Counter(shape(query.sql) for query in self.selects())
+        return [
+            Problem('n+1', sql, 'выполнен {} раз'.format(count))
+            for sql, count in counts.items() if count >= self.repeats
+        ]
+
+    def slow(self):
+        return [
+            Problem('slow', query.sql, '{:.1f} мс'.format(query.duration))
+            for query in self.queries if query.duration >= self.slow_ms
+        ]
+
+    def unindexed_sorts(self):
+        problems, seen = [], set()
+        for query in self.selects():
+            query_shape = shape(query.sql)
+            if 'ORDER BY' not in query.sql or query_shape in seen:
+                continue
+            seen.add(query_shape)
+            plan = explain(query)
+            markers = SORT_MARKERS.get(connections[query.alias].vendor, ())
+            for line in plan:
+                if any(marker in line for marker in markers):
+                    problems.append(Problem('sort', query.sql, line))
+                    break
+        return problems
+
+    def problems(self):
+        problems = self.repeated() + self.slow()
+        if self.explain:
+            problems += self.unindexed_sorts()
+        return problems
+
+    def report(self, problems=None, with_queries=False):
+        if problems is None:
+            problems = self.problems()
+        lines = ['SQL-запросов: {}'.format(len(self.queries))]
+        lines += [
+            '[{}] {}: {}'.format(problem.kind, problem.detail, problem.sql)
+            for problem in problems
+        ]
+        if with_queries:
+            lines += [
+                '{}. {}'.format(number, query.sql)
+                for number, query in enumerate(self.queries, 1)
+            ]
+        return '\n'.join(lines)
+
+
+def explain(query):
+    """Строки плана запроса; для неизвестных баз — пустой список."""
+    connection = connections[query.alias]
+    if connection.vendor == 'sqlite':
+        prefix, column = 'EXPLAIN QUERY PLAN ', -1
+    elif connection.vendor == 'postgresql':
+        prefix, column = 'EXPLAIN ', 0
+    else:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + query.sql, query.params)
+        return [str(row[column]) for row in cursor.fetchall()]
@@ -0,0 +1,78 @@
+"""
+Чтение тяжёлых лент с реплик.
+
+Реплика выбирается на весь запрос, если представление есть в
+REPLICA_READ_VIEWS. После первой записи запрос до конца читает
+основную базу, а после изменяющего запроса браузер ещё
+REPLICA_STICKY_SECONDS секунд ходит только в неё: реплика могла не
+успеть получить только что созданный пост или комментарий.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+PRIMARY = 'default'
+
+_local = threading.local()
+
+
+class RoutingState:
+    """Куда читать в текущем запросе."""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.replica = None
+        self.wrote = False
+
+
+def start_request(pinned=False):
+    _local.current = RoutingState(pinned)
+    return _local.current
+
+
+def finish_request():
+    _local.current = None
+
+
+def current():
+    """Состояние текущего запроса или None вне запроса."""
+    return getattr(_local, 'current', None)
+
+
+@contextmanager
+def primary_reads():
+    """Внутри блока текущий запрос читает только основную базу."""
+    state = current()
+    replica = state.replica if state is not None else None
+    if state is not None:
+        state.replica = None
+    try:
+        yield
+    finally:
+        if state is not None:
+            state.replica = replica
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = current()
+        if (
+            state is None or state.pinned or state.wrote
+            or state.replica not in settings.DATABASE_REPLICAS
+        ):
+            return PRIMARY
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = current()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На репликах те же данные, что и в основной базе
+        aliases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
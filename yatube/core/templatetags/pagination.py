@@ -0,0 +1,34 @@
+from django import template
+
+register = template.Library()
+
+
+def elided_page_range(page, on_each_side=2, on_ends=1):
+    """
+    Номера страниц рядом с текущей и по краям; None на месте пропуска.
+
+    Длина результата не зависит от общего числа страниц.
+    """
+    num_pages = page.paginator.num_pages
+    number = page.number
+    if num_pages <= (on_each_side + on_ends) * 2 + 1:
+        return list(range(1, num_pages + 1))
+    pages = []
+    if number > on_each_side + on_ends + 1:
+        pages.extend(range(1, on_ends + 1))
+        pages.append(None)
+        pages.extend(range(number - on_each_side, number + 1))
+    else:
+        pages.extend(range(1, number + 1))
+    if number < num_pages - on_each_side - on_ends:
+        pages.extend(range(number + 1, number + on_each_side + 1))
+        pages.append(None)
+        pages.extend(range(num_pages - on_ends + 1, num_pages + 1))
+    else:
+        pages.extend(range(number + 1, num_pages + 1))
+    return pages
+
+
+@register.filter
+def elided_range(page, on_each_side=2):
+    return elided_page_range(page, int(on_each_side))
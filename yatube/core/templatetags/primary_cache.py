@@ -0,0 +1,33 @@
+from django import template
+from django.templatetags.cache import CacheNode
+from django.templatetags.cache import do_cache as django_do_cache
+
+from core.routers import primary_reads
+
+register = template.Library()
+
+
+class PrimaryCacheNode(CacheNode):
+    """
+    {% cache %}, который рендерит фрагмент по основной базе.
+
+    Рендер нужен только при промахе, и его результат ляжет в кеш для
+    всех: фрагмент, собранный с отставшей реплики, держался бы до конца
+    таймаута уже под новой версией ленты.
+    """
+
+    def render(self, context):
+        with primary_reads():
+            return super().render(context)
+
+
+@register.tag('cache')
+def do_cache(parser, token):
+    node = django_do_cache(parser, token)
+    return PrimaryCacheNode(
+        node.nodelist,
+        node.expire_time_var,
+        node.fragment_name,
+        node.vary_on,
+        node.cache_name,
+    )
@@ -0,0 +1,71 @@
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+from .query_detector import QueryDetector
+
+# Медленные запросы в тестах только попадают в отчёт: время зависит от машины
+FAILING_PROBLEMS = ('n+1', 'sort')
+
+
+@contextmanager
+def assert_max_queries(limit, fail_on=FAILING_PROBLEMS):
+    """
+    Проверяет, что блок выполнил не больше limit запросов и в нём нет
+    N+1 и сортировок без индекса. EXPLAIN выполняется уже после блока
+    и в подсчёт не входит.
+    """
+    with QueryDetector() as detector:
+        yield detector
+    problems = [
+        problem for problem in detector.problems()
+        if problem.kind in fail_on
+    ]
+    over_limit = len(detector) > limit
+    if over_limit or problems:
+        raise AssertionError(
+            'Ожидалось не больше {} запросов.\n{}'.format(
+                limit, detector.report(problems, with_queries=over_limit)
+            )
+        )
+
+
+class QueryAssertionsMixin:
+    """assertMaxQueries для TestCase."""
+
+    def assertMaxQueries(self, limit, **kwargs):
+        return assert_max_queries(limit, **kwargs)
+
+
+@contextmanager
+def temporary_cache():
+    """Файловый кеш во временном каталоге вместо рабочего CACHE_LOCATION."""
+    location = tempfile.mkdtemp()
+    try:
+        with override_settings(
+            CACHE_LOCATION=location,
+            CACHES={
+                alias: {**params, 'LOCATION': location}
+                for alias, params in settings.CACHES.items()
+            },
+        ):
+            yield location
+    finally:
+        shutil.rmtree(location, ignore_errors=True)
+
+
+class TestRunner(DiscoverRunner):
+    """manage.py test с кешем во временном каталоге."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache = temporary_cache()
+        self._cache.__enter__()
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache.__exit__(None, None, None)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,132 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from core.cache import FileCache, TieredCache
+from core.metrics import registry
+
+
+class TieredCacheTest(SimpleTestCase):
+    """Два экземпляра с общим каталогом — как два воркера."""
+
+    def setUp(self):
+        registry.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.first = self.worker()
+        self.second = self.worker()
+
+    def worker(self, **local):
+        return TieredCache(self.directory, {
+            'SHARED': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCAL': {'BYPASS': ['feed_version'], **local},
+        })
+
+    def counter(self, name, tier):
+        return registry._counters.get((name, (('tier', tier),)), 0)
+
+    def test_value_is_shared_between_workers(self):
+        self.first.set('page', 'html')
+        self.assertEqual(self.second.get('page'), 'html')
+        self.assertEqual(self.second.get('page'), 'html')
+        self.assertEqual(
+            self.counter('yatube_cache_tier_hits_total', 'shared'), 1
+        )
+        self.assertEqual(
+            self.counter('yatube_cache_tier_hits_total', 'local'), 1
+        )
+        self.assertEqual(
+            self.counter('yatube_cache_tier_misses_total', 'local'), 1
+        )
+
+    def test_local_copy_expires(self):
+        self.second.set('page', 'old')
+        self.first.set('page', 'new')
+        self.assertEqual(self.second.get('page'), 'old')
+        with mock.patch('core.cache.time.monotonic', return_value=1e12):
+            self.assertEqual(self.second.get('page'), 'new')
+
+    def test_version_keys_bypass_local_tier(self):
+        self.first.set('feed_version', 1)
+        self.assertEqual(self.second.get('feed_version'), 1)
+        self.first.incr('feed_version')
+        self.assertEqual(self.second.get('feed_version'), 2)
+        self.assertNotIn(
+            self.second.make_key('feed_version'), self.second._local
+        )
+
+    def test_local_tier_is_bounded(self):
+        cache = self.worker(MAX_ENTRIES=2)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+        self.assertEqual(
+            list(cache._local), [cache.make_key('b'), cache.make_key('c')]
+        )
+        self.assertEqual(cache.get('a'), 'a')
+
+    def test_get_many_and_delete(self):
+        self.first.set_many({'a': 1, 'b': 2})
+        self.assertEqual(
+            self.second.get_many(['a', 'b', 'c']), {'a': 1, 'b': 2}
+        )
+        self.second.delete('a')
+        self.assertIsNone(self.second.get('a'))
+
+    def test_cached_objects_are_copies(self):
+        value = ['post']
+        self.first.set('list', value)
+        value.append('changed')
+        self.first.get('list').append('changed')
+        self.assertEqual(self.first.get('list'), ['post'])
+
+
+class FileCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.cache = FileCache(self.directory, {
+            'OPTIONS': {'MAX_ENTRIES': 2},
+        })
+
+    def test_set_does_not_list_directory(self):
+        with mock.patch.object(FileCache, '_list_cache_files') as listing:
+            for number in range(5):
+                self.cache.set('key_{}'.format(number), number)
+        listing.assert_not_called()
+        self.assertEqual(self.cache.get('key_0'), 0)
+
+    def test_cull_removes_expired_and_oldest(self):
+        self.cache.set('expired', 0, timeout=1)
+        for number, key in enumerate(('old', 'newer', 'newest')):
+            self.cache.set(key, number)
+            os.utime(
+                self.cache._key_to_file(key), (number, 1000 + number)
+            )
+        with mock.patch('time.time', return_value=time.time() + 10):
+            self.assertEqual(self.cache.cull(), 2)
+        self.assertIsNone(self.cache.get('old'))
+        self.assertEqual(self.cache.get('newer'), 1)
+        self.assertEqual(self.cache.get('newest'), 2)
+
+    def test_command_culls_wrapped_file_cache(self):
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'core.cache.InstrumentedCache',
+            'WRAPS': 'core.cache.TieredCache',
+            'SHARED': 'core.cache.FileCache',
+            'LOCATION': self.directory,
+            'OPTIONS': {'MAX_ENTRIES': 1},
+        }}):
+            self.cache.set('old', 0)
+            self.cache.set('new', 1)
+            os.utime(self.cache._key_to_file('old'), (0, 0))
+            out = StringIO()
+            call_command('cull_cache', stdout=out)
+        self.assertIn('1', out.getvalue())
+        self.assertFalse(self.cache.has_key('old'))
+        self.assertTrue(self.cache.has_key('new'))
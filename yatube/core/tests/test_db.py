@@ -0,0 +1,37 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from core.db import configure_sqlite
+
+
+class SqlitePragmasTest(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA {}'.format(name))
+            return cursor.fetchone()[0]
+
+    def test_new_connection_is_configured(self):
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+
+    @override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234})
+    def test_pragmas_come_from_settings(self):
+        # Тестовая база в памяти не закрывается: вызываем обработчик сами
+        configure_sqlite(sender=type(connection), connection=connection)
+        self.assertEqual(self.pragma('busy_timeout'), 1234)
+
+
+class BenchmarkSqliteTest(TestCase):
+    def test_reports_both_profiles(self):
+        out = StringIO()
+        call_command(
+            'benchmark_sqlite', readers=1, writers=1, seconds=0.2, rows=10,
+            stdout=out,
+        )
+        lines = out.getvalue().splitlines()
+        self.assertEqual(
+            [line.split()[0] for line in lines[1:]], ['default', 'tuned']
+        )
@@ -0,0 +1,108 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import resolve, reverse
+
+from core import metrics
+from core.metrics import (SNAPSHOT_KEY, WORKERS_KEY, Registry, percentile,
+                          registry)
+
+User = get_user_model()
+
+
+class PercentileTest(TestCase):
+    def test_nearest_rank(self):
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 50), 50)
+        self.assertEqual(percentile(samples, 99), 99)
+        self.assertEqual(percentile([7], 99), 7)
+
+
+@override_settings(METRICS_TOKEN='secret')
+class InstrumentationTest(TestCase):
+    def setUp(self):
+        registry.clear()
+        cache.clear()
+
+    def get_metrics(self, token='secret'):
+        return self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer {}'.format(token)
+        )
+
+    def test_server_timing_header(self):
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for part in ('db;dur=', 'queries"', 'tpl;dur=', 'cache;desc=',
+                     'total;dur='):
+            with self.subTest(part=part):
+                self.assertIn(part, timing)
+
+    def test_server_timing_is_hidden_from_visitors(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        with self.settings(DEBUG=True):
+            response = self.client.get(reverse('posts:index'))
+        self.assertTrue(response.has_header('Server-Timing'))
+
+    def test_metrics_are_grouped_by_view(self):
+        url = reverse('posts:index')
+        self.client.get(url)
+        self.client.get(url)
+        body = self.get_metrics().content.decode()
+        view = 'view="{}"'.format(resolve(url).view_name)
+        self.assertIn('yatube_requests_total{%s} 2' % view, body)
+        self.assertIn(
+            'yatube_request_duration_ms{%s,quantile="0.99"}' % view, body
+        )
+        self.assertIn('yatube_db_queries_count{%s} 2' % view, body)
+        self.assertIn('# TYPE yatube_template_duration_ms summary', body)
+        # Второй рендер главной берёт фрагмент из кеша
+        self.assertRegex(body, r'yatube_cache_hits_total\{%s\} [1-9]' % view)
+
+    def test_metrics_sum_all_workers(self):
+        url = reverse('posts:index')
+        view = resolve(url).view_name
+        other = Registry()
+        other.inc('yatube_requests_total', 3, view=view)
+        other.observe('yatube_db_queries', 100, view=view)
+        cache.set(SNAPSHOT_KEY.format('other:1'), other.snapshot())
+        cache.set(WORKERS_KEY, ['other:1', 'gone:2'])
+        self.client.get(url)
+        body = self.get_metrics().content.decode()
+        view = 'view="{}"'.format(view)
+        self.assertIn('yatube_requests_total{%s} 4' % view, body)
+        self.assertIn('yatube_db_queries_count{%s} 2' % view, body)
+        self.assertIn(
+            'yatube_db_queries{%s,quantile="0.99"} 100' % view, body
+        )
+        # Воркер без снимка выпадает из списка
+        workers = cache.get(WORKERS_KEY)
+        self.assertIn('other:1', workers)
+        self.assertNotIn('gone:2', workers)
+        self.assertEqual(len(workers), 2)
+
+    def test_metrics_require_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+        self.assertEqual(self.get_metrics('wrong').status_code, 404)
+        with self.settings(METRICS_TOKEN=None):
+            self.assertEqual(self.get_metrics().status_code, 404)
+
+
+class InstrumentedCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.request_metrics = metrics.start_request()
+        self.addCleanup(metrics.finish_request)
+
+    def test_hits_and_misses(self):
+        cache.set('present', 0)
+        self.assertEqual(cache.get('present', 'default'), 0)
+        self.assertEqual(cache.get('absent', 'default'), 'default')
+        self.assertEqual(
+            cache.get_many(['present', 'absent']), {'present': 0}
+        )
+        self.assertEqual(self.request_metrics.cache_hits, 2)
+        self.assertEqual(self.request_metrics.cache_misses, 2)
+        self.assertEqual(cache.incr('present'), 1)
@@ -0,0 +1,75 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from core.query_detector import QueryDetector, explain, shape
+from core.testing import QueryAssertionsMixin
+from posts.models import Post
+
+User = get_user_model()
+
+
+class QueryDetectorTest(QueryAssertionsMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for i in range(6):
+            author = User.objects.create_user(username='user_{}'.format(i))
+            Post.objects.create(text='Text', author=author)
+
+    def test_shape_hides_values(self):
+        self.assertEqual(
+            shape("SELECT 1 FROM t WHERE a IN (%s, %s) AND b = 'x'"),
+            shape("SELECT 2 FROM t WHERE a IN (%s) AND b = 'y'"),
+        )
+
+    def test_n_plus_one(self):
+        with QueryDetector(repeats=5, explain=False) as detector:
+            for post in Post.objects.all():
+                post.author.username
+        problems = detector.problems()
+        self.assertEqual([problem.kind for problem in problems], ['n+1'])
+        self.assertIn('auth_user', problems[0].sql)
+
+    def test_select_related_is_clean(self):
+        with self.assertMaxQueries(1):
+            for post in Post.objects.select_related('author'):
+                post.author.username
+
+    def test_slow_query(self):
+        with QueryDetector(slow_ms=0.000001, explain=False) as detector:
+            Post.objects.count()
+        self.assertEqual(
+            [problem.kind for problem in detector.problems()], ['slow']
+        )
+
+    def test_unindexed_sort(self):
+        with QueryDetector() as detector:
+            list(Post.objects.order_by('text'))
+            list(Post.objects.order_by('-pub_date', '-id'))
+        problems = detector.problems()
+        self.assertEqual([problem.kind for problem in problems], ['sort'])
+        self.assertIn('"text"', problems[0].sql)
+
+    def test_budget_failure_lists_queries(self):
+        with self.assertRaisesRegex(AssertionError, 'auth_user'):
+            with self.assertMaxQueries(0):
+                User.objects.count()
+
+    @override_settings(DEBUG=True, QUERY_DETECTOR=True)
+    def test_middleware_explains_after_instrumentation(self):
+        requests = []
+
+        def explain_outside_request(query):
+            requests.append(metrics.current())
+            return explain(query)
+
+        with mock.patch(
+            'core.query_detector.explain', explain_outside_request
+        ):
+            self.client.get(reverse('posts:index'))
+        self.assertTrue(requests)
+        self.assertEqual(set(requests), {None})
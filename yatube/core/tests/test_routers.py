@@ -0,0 +1,137 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import routers
+from core.middleware import ReplicaRoutingMiddleware
+from posts.counters import ALL_POSTS, group_key
+from posts.models import FeedCounter, Group, Post
+
+User = get_user_model()
+
+REPLICA = 'replica'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRoutingTest(TestCase):
+    """Основная база — тестовая, реплика — отдельный файл SQLite."""
+
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        # Алиас нужен до super(): TestCase открывает транзакции
+        # во всех базах из databases
+        connections.databases[REPLICA] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(cls.directory, 'replica.sqlite3'),
+        }
+        with override_settings(DATABASE_REPLICAS=[REPLICA]):
+            call_command('migrate', database=REPLICA, verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections.databases[REPLICA]
+        delattr(connections._connections, REPLICA)
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group(title='Группа', slug='group', description='')
+        # bulk_create — чтобы обработчики сигналов не писали в основную
+        # базу, пока заполняется реплика
+        Group.objects.bulk_create([cls.group])
+        cls.group = Group.objects.get(slug='group')
+        Post.objects.create(
+            text='Пост из основной базы', author=cls.user, group=cls.group
+        )
+        # Реплика отстала: в ней другой пост
+        User.objects.using(REPLICA).bulk_create([
+            User(pk=cls.user.pk, username=cls.user.username)
+        ])
+        Group.objects.using(REPLICA).bulk_create([
+            Group(pk=cls.group.pk, title='Группа', slug='group')
+        ])
+        Post.objects.using(REPLICA).bulk_create([
+            Post(
+                text='Пост с реплики', author_id=cls.user.pk,
+                group_id=cls.group.pk
+            )
+        ])
+        FeedCounter.objects.using(REPLICA).bulk_create([
+            FeedCounter(key=ALL_POSTS, value=1),
+            FeedCounter(key=group_key(cls.group.pk), value=1),
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.url = reverse('posts:group_posts', args=[self.group.slug])
+
+    def test_feed_reads_replica(self):
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Пост с реплики')
+        self.assertNotContains(response, 'Пост из основной базы')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_reads_primary(self):
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Пост из основной базы')
+
+    def test_read_after_write_uses_primary(self):
+        response = self.client.post(
+            reverse('posts:post_create'),
+            {'text': 'Новый пост', 'group': self.group.pk},
+            follow=True
+        )
+        self.assertContains(response, 'Новый пост')
+        self.assertIn(ReplicaRoutingMiddleware.COOKIE, self.client.cookies)
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Новый пост')
+        self.assertContains(response, 'Пост из основной базы')
+
+    def test_follow_on_get_pins_the_profile_redirect(self):
+        author = User.objects.create_user(username='followed')
+        User.objects.using(REPLICA).bulk_create([
+            User(pk=author.pk, username=author.username)
+        ])
+        response = self.client.get(
+            reverse('posts:profile_follow', args=[author.username]),
+            follow=True
+        )
+        self.assertIn(ReplicaRoutingMiddleware.COOKIE, self.client.cookies)
+        self.assertTrue(response.context['following'])
+
+    def test_feed_bookkeeping_does_not_pin(self):
+        FeedCounter.objects.using(REPLICA).filter(
+            key=group_key(self.group.pk)
+        ).delete()
+        self.client.get(self.url)
+        self.assertNotIn(ReplicaRoutingMiddleware.COOKIE, self.client.cookies)
+
+    def test_sticky_window_expires(self):
+        self.client.post(reverse('posts:post_create'), {'text': 'Новый пост'})
+        self.client.cookies[ReplicaRoutingMiddleware.COOKIE] = '0'
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Пост с реплики')
+
+    def test_cached_fragment_is_rendered_from_primary(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Пост из основной базы')
+        self.assertNotContains(response, 'Пост с реплики')
+
+    def test_outside_requests_use_primary(self):
+        self.assertIsNone(routers.current())
+        self.assertEqual(Post.objects.all().db, routers.PRIMARY)
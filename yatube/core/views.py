@@ -1,5 +1,11 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from .metrics import registry
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -11,3 +17,21 @@ def permission_denied(request, exception):
 
 def server_error(request):
     return render(request, 'core/500.html', {}, status=500)
+
+
+def metrics(request):
+    """
+    Метрики всех воркеров в формате Prometheus. Отдаются только
+    с заголовком Authorization: Bearer METRICS_TOKEN; без токена
+    в настройках страницы нет.
+    """
+    token = settings.METRICS_TOKEN
+    if not token or not hmac.compare_digest(
+        request.META.get('HTTP_AUTHORIZATION', ''),
+        'Bearer {}'.format(token)
+    ):
+        raise Http404
+    return HttpResponse(
+        registry.collect(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Group, Post, Follow
+from .search import query_terms, search_posts
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -10,6 +11,16 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Текст ищем по индексу, а не сканированием LIKE '%...%'
+        if not query_terms(search_term):
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return queryset.filter(
+            pk__in=search_posts(search_term).values('pk')
+        ), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('title', 'slug', 'description',)
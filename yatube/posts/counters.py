@@ -0,0 +1,90 @@
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils.functional import cached_property
+
+from .models import FeedCounter, Post
+
+ALL_POSTS = 'all'
+
+
+def group_key(group_id):
+    return 'group:{}'.format(group_id)
+
+
+def author_key(author_id):
+    return 'author:{}'.format(author_id)
+
+
+def feed_count(key, queryset):
+    """Читает счётчик ленты; при первом обращении считает посты один раз."""
+    value = FeedCounter.objects.filter(key=key).values_list(
+        'value', flat=True
+    ).first()
+    if value is None:
+        value = create_count(key, queryset)
+    return value
+
+
+def create_count(key, queryset):
+    """
+    Заводит счётчик и считает посты в одной транзакции.
+
+    Строка появляется раньше подсчёта: с этого момента правки из
+    сигналов ждут её блокировку и ложатся поверх посчитанного значения,
+    а не теряются, пока строки ещё нет.
+    """
+    with transaction.atomic():
+        counter, created = FeedCounter.objects.select_for_update(
+        ).get_or_create(key=key, defaults={'value': 0})
+        if created:
+            counter.value = queryset.count()
+            counter.save(update_fields=['value'])
+    return counter.value
+
+
+def change_count(key, delta):
+    FeedCounter.objects.filter(key=key).update(value=F('value') + delta)
+
+
+def drop_count(key):
+    FeedCounter.objects.filter(key=key).delete()
+
+
+def recount_feeds(batch_size=1000):
+    """Выравнивает все заведённые счётчики по таблице постов."""
+    counts = {ALL_POSTS: Post.objects.count()}
+    for make_key, column in ((group_key, 'group'), (author_key, 'author')):
+        counts.update(
+            (make_key(value), count)
+            for value, count in Post.objects.values_list(column).annotate(
+                Count('pk')
+            ).order_by()
+            if value is not None
+        )
+    counters = list(FeedCounter.objects.all())
+    for counter in counters:
+        counter.value = counts.get(counter.key, 0)
+    FeedCounter.objects.bulk_update(counters, ['value'], batch_size=batch_size)
+    return len(counters)
+
+
+class CountedPaginator(Paginator):
+    """
+    Paginator, берущий общее число постов из счётчика ленты
+    или из уже известного значения, например Tag.posts_count.
+    """
+
+    def __init__(
+        self, object_list, per_page, count_key=None, known_count=None,
+        **kwargs
+    ):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        self.known_count = known_count
+
+    @cached_property
+    def count(self):
+        if self.known_count is not None:
+            return self.known_count
+        return feed_count(self.count_key, self.object_list)
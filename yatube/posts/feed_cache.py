@@ -0,0 +1,24 @@
+import time
+
+from django.core.cache import cache
+
+FEED_VERSION_KEY = 'feed_version'
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def feed_version():
+    """Текущая версия лент; входит в ключ каждого закешированного фрагмента."""
+    version = cache.get(FEED_VERSION_KEY)
+    if version is None:
+        # Время вместо единицы: после вытеснения ключа версия не повторится
+        version = int(time.time() * 1000)
+        if not cache.add(FEED_VERSION_KEY, version, None):
+            version = cache.get(FEED_VERSION_KEY, version)
+    return version
+
+
+def bump_feed_version():
+    try:
+        cache.incr(FEED_VERSION_KEY)
+    except ValueError:
+        feed_version()
@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from .images import normalize_upload
 from .models import Post, Comment
 
 
@@ -16,6 +18,12 @@ class PostForm(forms.ModelForm):
             'group': 'Группа',
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return normalize_upload(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,59 @@
+import random
+
+from django.contrib.auth import get_user_model
+from mixer.backend.django import Mixer
+
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def generate(users=50, groups=5, posts=500, comments=1000, follows=200,
+             seed=0, prefix='bench'):
+    """
+    Заполняет базу данными для замеров через mixer и Faker.
+
+    Объекты создаются по одному, поэтому все сигналы — счётчики, ленты,
+    поиск — отрабатывают как при обычной работе сайта. Одинаковый seed
+    даёт одинаковые данные. Возвращает созданных пользователей, группы
+    и посты.
+    """
+    rng = random.Random(seed)
+    mixer = Mixer(locale='ru')
+    mixer.faker.seed_instance(seed)
+    created_users = mixer.cycle(users).blend(
+        User, username=mixer.sequence(prefix + '_user_{0}')
+    )
+    created_groups = mixer.cycle(groups).blend(
+        Group,
+        slug=mixer.sequence(prefix + '-group-{0}'),
+        title=mixer.faker.catch_phrase,
+        description=mixer.faker.paragraph,
+    )
+    created_posts = [
+        mixer.blend(
+            Post,
+            author=rng.choice(created_users),
+            group=rng.choice(created_groups + [None]),
+            text=mixer.faker.paragraph(),
+            image='',
+        )
+        for _ in range(posts)
+    ]
+    for _ in range(comments):
+        mixer.blend(
+            Comment,
+            post=rng.choice(created_posts),
+            author=rng.choice(created_users),
+            text=mixer.faker.sentence(),
+        )
+    pairs = set()
+    follows = min(follows, users * (users - 1))
+    while len(pairs) < follows:
+        user, author = rng.sample(created_users, 2)
+        pairs.add((user, author))
+    for user, author in sorted(pairs, key=lambda pair: (
+        pair[0].pk, pair[1].pk
+    )):
+        Follow.objects.create(user=user, author=author)
+    return created_users, created_groups, created_posts
@@ -0,0 +1,274 @@
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from django.db import connections, transaction
+from django.db.models import F
+from PIL import Image, ImageOps
+from sorl.thumbnail import default, delete, get_thumbnail
+from sorl.thumbnail.base import EXTENSIONS
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.models import KVStore as KVStoreRow
+
+from .feed_cache import bump_feed_version
+from .models import ImageBlob
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+MIME_TYPES = {
+    'AVIF': 'image/avif',
+    'WEBP': 'image/webp',
+    'JPEG': 'image/jpeg',
+}
+
+
+def image_formats():
+    """Форматы из POST_IMAGE_FORMATS, которые умеют сохранять Pillow и sorl."""
+    Image.init()
+    return tuple(
+        image_format for image_format in settings.POST_IMAGE_FORMATS
+        if image_format in Image.SAVE and image_format in EXTENSIONS
+    )
+
+
+def image_variants():
+    """Пары (формат, ширина, геометрия, опции) для всех вариантов картинки."""
+    ratio_width, ratio_height = settings.POST_IMAGE_RATIO
+    return [
+        (
+            image_format,
+            width,
+            '{}x{}'.format(width, round(width * ratio_height / ratio_width)),
+            {'crop': 'center', 'upscale': True, 'format': image_format},
+        )
+        for image_format in image_formats()
+        for width in settings.POST_IMAGE_WIDTHS
+    ]
+
+
+def _thumbnail_name(source, geometry, options):
+    # Те же умолчания, что подставляет sorl в get_thumbnail: иначе имя
+    # разойдётся с именем построенного файла
+    backend = default.backend
+    options = dict(options)
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return backend._get_thumbnail_filename(source, geometry, options)
+
+
+def _stored_keys(keys):
+    """Какие ключи есть в хранилище sorl — одним запросом на все."""
+    kvstore = default.kvstore
+    if not isinstance(kvstore, cached_db_kvstore.KVStore):
+        return {key for key in keys if kvstore._get_raw(key)}
+    empty = cached_db_kvstore.EMPTY_VALUE
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict(KVStoreRow.objects.filter(
+            key__in=missing
+        ).values_list('key', 'value'))
+        # Как sorl, запоминаем и отсутствие, чтобы не ходить в базу снова
+        fresh = {key: found.get(key, empty) for key in missing}
+        kvstore.cache.set_many(fresh, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(fresh)
+    return {key for key, value in values.items() if value != empty}
+
+
+def built_variants(image):
+    """
+    Готовые варианты картинки: (формат, ширина, геометрия, url или None).
+
+    Миниатюры здесь не строятся: их делают после загрузки и командой
+    generate_thumbnails, а страница не ждёт ресайза.
+    """
+    # По имени, как в generate_thumbnails: хранилище источника входит
+    # в ключ sorl, и с другим хранилищем имена вариантов не совпадут
+    source = ImageFile(image.name)
+    thumbnails = [
+        (image_format, width, geometry, ImageFile(
+            _thumbnail_name(source, geometry, options), default.storage
+        ))
+        for image_format, width, geometry, options in image_variants()
+    ]
+    stored = _stored_keys([
+        add_prefix(thumbnail.key) for *_, thumbnail in thumbnails
+    ])
+    return [
+        (
+            image_format, width, geometry,
+            thumbnail.url if add_prefix(thumbnail.key) in stored else None,
+        )
+        for image_format, width, geometry, thumbnail in thumbnails
+    ]
+
+
+def generate_thumbnails(name):
+    """Строит все варианты картинки поста для файла в хранилище."""
+    for _, _, geometry, options in image_variants():
+        get_thumbnail(name, geometry, **options)
+
+
+def pregenerate(name):
+    """
+    Как generate_thumbnails, но ошибка одного файла только логируется.
+    Возвращает True, если все варианты построены.
+    """
+    try:
+        generate_thumbnails(name)
+    except Exception:
+        logger.exception('Не удалось построить миниатюры для %s', name)
+        return False
+    return True
+
+
+def pregenerate_upload(name):
+    """
+    Строит миниатюры новой картинки и сбрасывает фрагменты лент:
+    до этого в них закешированы ссылки на исходный файл.
+    """
+    if pregenerate(name):
+        bump_feed_version()
+
+
+def pregenerate_in_worker(name, build=pregenerate):
+    try:
+        return build(name)
+    finally:
+        # У потока пула свои соединения: sorl пишет в key-value хранилище
+        connections.close_all()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def _exists(name):
+    try:
+        return default_storage.exists(name)
+    except SuspiciousFileOperation:
+        return False
+
+
+def _submit(name):
+    # Имя без файла в хранилище (например, испорченная запись) не стоит потока
+    if not _exists(name):
+        return
+    if not settings.THUMBNAIL_WORKERS:
+        pregenerate_upload(name)
+    else:
+        _get_executor().submit(
+            pregenerate_in_worker, name, pregenerate_upload
+        )
+
+
+def schedule_thumbnails(name):
+    """После коммита отдаёт построение миниатюр пулу потоков."""
+    transaction.on_commit(lambda: _submit(name))
+
+
+def retain_image(name):
+    """Учитывает ещё одну ссылку поста на файл."""
+    if not ImageBlob.objects.filter(name=name).update(refs=F('refs') + 1):
+        blob, created = ImageBlob.objects.get_or_create(
+            name=name, defaults={'refs': 1}
+        )
+        if not created:
+            ImageBlob.objects.filter(pk=blob.pk).update(refs=F('refs') + 1)
+
+
+def release_image(name):
+    """Снимает ссылку; последняя удаляет файл и его миниатюры."""
+    ImageBlob.objects.filter(name=name).update(refs=F('refs') - 1)
+    if ImageBlob.objects.filter(name=name, refs__lte=0).exists():
+        transaction.on_commit(lambda: _delete_file(name))
+
+
+def _delete_file(name):
+    # Строка блокируется до удаления файла: retain_image в это время ждёт
+    # и после нас создаёт новую строку, а файл запишется заново
+    with transaction.atomic():
+        blob = ImageBlob.objects.select_for_update().filter(
+            name=name, refs__lte=0
+        ).first()
+        if blob is None:
+            return
+        if _exists(name):
+            try:
+                delete(name)
+            except Exception:
+                logger.exception('Не удалось удалить %s', name)
+        blob.delete()
+
+
+def normalize_upload(upload):
+    """
+    Приводит загруженную картинку к виду для хранения.
+
+    Поворачивает по EXIF, убирает метаданные и уменьшает до
+    POST_IMAGE_MAX_SIDE. JPEG декодируется сразу в уменьшенном масштабе
+    через draft(), результат пишется во временный файл, поэтому память
+    не растёт вместе с размером исходника. Картинки, которые уже
+    помещаются в лимит и не несут EXIF, возвращаются как есть.
+    """
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    upload.seek(0)
+    image = Image.open(upload)
+    image_format = image.format
+    if (
+        getattr(image, 'is_animated', False)
+        or image_format not in Image.SAVE
+        or (max(image.size) <= max_side and 'exif' not in image.info)
+    ):
+        upload.seek(0)
+        return upload
+    if image_format == 'JPEG':
+        image.draft(image.mode, (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    # PNG и WebP иначе допишут EXIF из info обратно в файл
+    image.info.pop('exif', None)
+    image.thumbnail((max_side, max_side))
+    options = {}
+    if image_format == 'JPEG':
+        if image.mode not in ('RGB', 'L', 'CMYK'):
+            image = image.convert('RGB')
+        options = {
+            'quality': settings.POST_IMAGE_QUALITY,
+            'optimize': True,
+            'progressive': True,
+        }
+    if 'icc_profile' in image.info:
+        options['icc_profile'] = image.info['icc_profile']
+    output = tempfile.SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    image.save(output, image_format, **options)
+    size = output.tell()
+    output.seek(0)
+    return UploadedFile(
+        output,
+        name=upload.name,
+        content_type=Image.MIME.get(image_format, upload.content_type),
+        size=size,
+    )
@@ -0,0 +1,153 @@
+import json
+import platform
+import time
+import tracemalloc
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.metrics import percentile
+from core.query_detector import QueryDetector
+from posts.generator import generate
+
+VOLUMES = (
+    ('users', 50),
+    ('groups', 5),
+    ('posts', 500),
+    ('comments', 1000),
+    ('follows', 200),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время ответа, число SQL-запросов и выделенную память '
+        'для основных страниц и пишет результат в JSON. Данные создаются '
+        'в транзакции, которая затем откатывается.'
+    )
+
+    def add_arguments(self, parser):
+        for name, default in VOLUMES:
+            parser.add_argument('--' + name, type=int, default=default)
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='замерять без кеша: каждый запрос идёт в базу',
+        )
+        parser.add_argument(
+            '--output', default='-', help='файл для JSON, «-» — stdout',
+        )
+
+    def handle(self, *args, **options):
+        if options['cold']:
+            with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+            }}):
+                views = self.run(options)
+        else:
+            views = self.run(options)
+        result = {
+            'meta': {
+                'created': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'runs': options['runs'],
+                'seed': options['seed'],
+                'cold': options['cold'],
+                'volumes': {name: options[name] for name, _ in VOLUMES},
+            },
+            'views': views,
+        }
+        text = json.dumps(result, ensure_ascii=False, indent=2)
+        if options['output'] == '-':
+            self.stdout.write(text)
+        else:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(text + '\n')
+            self.stderr.write('Результат записан в {}'.format(
+                options['output']
+            ))
+
+    def run(self, options):
+        with transaction.atomic():
+            users, groups, posts = generate(
+                seed=options['seed'],
+                **{name: options[name] for name, _ in VOLUMES}
+            )
+            # Как в продакшене: с DEBUG детектор запросов из middleware
+            # выполнял бы EXPLAIN внутри замера, а Django копил бы
+            # connection.queries
+            with override_settings(DEBUG=False, QUERY_DETECTOR=False):
+                views = self.measure_views(
+                    users, groups, posts, options['runs']
+                )
+            transaction.set_rollback(True)
+        return views
+
+    def measure_views(self, users, groups, posts, runs):
+        reader = max(users, key=lambda user: user.follower.count())
+        author = max(users, key=lambda user: user.posts.count())
+        group = max(groups, key=lambda item: item.posts.count())
+        client = Client()
+        client.force_login(reader)
+        requests = (
+            ('index', lambda: client.get(reverse('posts:index'))),
+            ('group_posts', lambda: client.get(
+                reverse('posts:group_posts', args=[group.slug])
+            )),
+            ('profile', lambda: client.get(
+                reverse('posts:profile', args=[author.username])
+            )),
+            ('post_detail', lambda: client.get(
+                reverse('posts:post_detail', args=[posts[0].pk])
+            )),
+            ('follow_index', lambda: client.get(
+                reverse('posts:follow_index')
+            )),
+            ('post_create', lambda: client.post(
+                reverse('posts:post_create'), {'text': 'Benchmark'}
+            )),
+        )
+        return {
+            name: self.measure(runs, request) for name, request in requests
+        }
+
+    @staticmethod
+    def measure(runs, request):
+        latencies, queries, allocations = [], [], []
+        # Первый запрос прогревает кеши, шаблоны и соединение и в
+        # результат не входит
+        request()
+        for _ in range(runs):
+            with QueryDetector(explain=False) as detector:
+                started = time.perf_counter()
+                response = request()
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(detector))
+        # tracemalloc заметно замедляет код, поэтому память меряется
+        # отдельным проходом и не искажает время ответа
+        for _ in range(runs):
+            tracemalloc.start()
+            request()
+            allocations.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        return {
+            'status': response.status_code,
+            'latency_ms': summary(latencies),
+            'queries': summary(queries),
+            'peak_alloc_bytes': summary(allocations),
+        }
+
+
+def summary(samples):
+    return {
+        'p50': round(percentile(samples, 50), 3),
+        'p90': round(percentile(samples, 90), 3),
+        'p99': round(percentile(samples, 99), 3),
+        'max': round(max(samples), 3),
+    }
@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts.counters import ALL_POSTS
+from posts.models import Comment, FeedCounter, Follow, Group, Post
+from posts.paginators import CursorPaginator
+from posts.timeline import Timeline, TimelinePaginator
+from posts.views import POSTS_ON_VIEW
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Печатает планы EXPLAIN для запросов, которые выполняют ленты.'
+
+    def handle(self, *args, **options):
+        for name, queryset in self.queries():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain())
+            self.stdout.write('')
+
+    def queries(self):
+        # Несуществующие id тоже дают план, поэтому база может быть пустой
+        post = Post.objects.order_by('pk').first() or Post(pk=0)
+        group_id = Group.objects.values_list('pk', flat=True).first() or 0
+        user = User.objects.order_by('pk').first() or User(pk=0)
+        feed = Post.objects.for_feed()
+        cursor = CursorPaginator(feed, POSTS_ON_VIEW)
+        deep_page = cursor.encode_cursor(post)
+        timeline = Timeline(user)
+        timeline_cursor = TimelinePaginator(timeline, POSTS_ON_VIEW)
+        values, reverse = timeline_cursor.read_cursor(deep_page)
+        # Источники слитой ленты так, будто читатель подписан на
+        # популярного автора; UNION ALL просто склеивает их строки
+        entries, celebrity = Timeline(user, celebrities=[user.pk]).sources(
+            POSTS_ON_VIEW + 1, values, reverse
+        )
+        return (
+            ('index', feed[:POSTS_ON_VIEW]),
+            ('index, cursor', cursor.page_queryset(deep_page)[0][
+                :POSTS_ON_VIEW + 1
+            ]),
+            ('group_posts', feed.filter(group_id=group_id)[:POSTS_ON_VIEW]),
+            ('profile', feed.filter(author=user)[:POSTS_ON_VIEW]),
+            ('profile, following', Follow.objects.filter(
+                user=user, author=user
+            )),
+            # Обе ветки follow_index: какая выполнится, зависит от того,
+            # подписан ли читатель на популярных авторов
+            ('follow_index', timeline.entries()[:POSTS_ON_VIEW]),
+            ('follow_index, cursor', timeline.entries(values, reverse)[
+                :POSTS_ON_VIEW + 1
+            ]),
+            ('follow_index, popular authors: entries', entries),
+            ('follow_index, popular authors: author posts', celebrity),
+            ('post_detail', feed.filter(pk=post.pk)),
+            ('post_detail, comments', Comment.objects.filter(
+                post=post
+            ).order_by('created', 'id')),
+            ('feed counter', FeedCounter.objects.filter(key=ALL_POSTS)),
+        )
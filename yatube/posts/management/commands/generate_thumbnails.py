@@ -0,0 +1,31 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.feed_cache import bump_feed_version
+from posts.images import pregenerate, pregenerate_in_worker
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Строит недостающие миниатюры для уже загруженных картинок постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.THUMBNAIL_WORKERS,
+            help='0 — строить в текущем потоке',
+        )
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').order_by().values_list(
+            'image', flat=True
+        ).distinct().iterator()
+        if not options['workers']:
+            done = sum(1 for _ in map(pregenerate, names))
+        else:
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                done = sum(1 for _ in pool.map(pregenerate_in_worker, names))
+        # Фрагменты лент с исходными картинками вместо миниатюр
+        bump_feed_version()
+        self.stdout.write('Обработано картинок: {}'.format(done))
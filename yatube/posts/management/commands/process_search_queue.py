@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.search import flush_queue
+
+
+class Command(BaseCommand):
+    help = (
+        'Переиндексирует посты из очереди поиска пачками. С --interval '
+        'работает как фоновый воркер и опрашивает очередь, пока его '
+        'не остановят.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.SEARCH_INDEX_BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help='сколько записей разобрать за один проход',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='пауза между проходами в секундах; 0 — один проход',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            done = flush_queue(options['batch_size'], options['limit'])
+            if done or not options['interval']:
+                self.stdout.write('Проиндексировано записей: {}'.format(done))
+            if not options['interval']:
+                return
+            if not done:
+                time.sleep(options['interval'])
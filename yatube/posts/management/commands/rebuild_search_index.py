@@ -0,0 +1,68 @@
+from itertools import islice
+from multiprocessing import Pool, cpu_count
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post, SearchQueueEntry
+from posts.search import terms, write_terms
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def analyze(batch):
+    """Стемминг пачки в процессе-воркере; в базу воркеры не ходят."""
+    return {pk: terms(text) for pk, text in batch}
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс постов в нескольких процессах.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--workers', type=int, default=cpu_count(),
+            help='0 — считать в текущем процессе',
+        )
+
+    def handle(self, *args, **options):
+        # Правки, сделанные во время перестройки, останутся в очереди
+        last_queued = SearchQueueEntry.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first()
+        rows = Post.objects.order_by('pk').values_list(
+            'pk', 'text'
+        ).iterator(chunk_size=options['batch_size'])
+        chunks = batches(rows, options['batch_size'])
+        if not options['workers']:
+            total = self.write(map(analyze, chunks))
+        else:
+            with Pool(options['workers']) as pool:
+                # imap читает задания заранее: окно в несколько пачек
+                # на воркер не даёт выгрузить в память всю таблицу
+                window = options['workers'] * 2
+                total = 0
+                while True:
+                    part = list(islice(chunks, window))
+                    if not part:
+                        break
+                    total += self.write(pool.imap(analyze, part))
+        if last_queued is not None:
+            SearchQueueEntry.objects.filter(pk__lte=last_queued).delete()
+        self.stdout.write('Проиндексировано постов: {}'.format(total))
+
+    @staticmethod
+    def write(results):
+        total = 0
+        for post_terms in results:
+            with transaction.atomic():
+                write_terms(post_terms)
+            total += len(post_terms)
+        return total
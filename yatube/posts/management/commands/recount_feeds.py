@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import recount_feeds
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики лент, если они разошлись с постами.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = recount_feeds()
+        self.stdout.write('Пересчитано счётчиков: {}'.format(total))
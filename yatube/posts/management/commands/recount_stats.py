@@ -0,0 +1,31 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.stats import recount
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает статистику пользователей пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        user_ids = User.objects.order_by('pk').values_list('pk', flat=True)
+        batch, total = [], 0
+        for user_id in user_ids.iterator():
+            batch.append(user_id)
+            if len(batch) == options['batch_size']:
+                total += self.recount(batch)
+                batch = []
+        if batch:
+            total += self.recount(batch)
+        self.stdout.write('Пересчитано пользователей: {}'.format(total))
+
+    @staticmethod
+    def recount(batch):
+        with transaction.atomic():
+            return recount(batch)
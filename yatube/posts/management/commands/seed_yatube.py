@@ -0,0 +1,355 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from faker import Faker
+
+from posts.counters import ALL_POSTS, drop_count
+from posts.feed_cache import bump_feed_version
+from posts.models import (CelebrityAuthor, Comment, Follow, Group, Mention,
+                          Post, PostTag, Tag, UserStats)
+from posts.search import terms, write_terms
+from posts.stats import recount
+from posts.tags import extract_mentions, extract_tags, normalize_tag
+from posts.timeline import fan_out_author
+
+User = get_user_model()
+
+SENTENCE_POOL = 2000
+TAG_POOL = 300
+TAGGED_SHARE = 0.1
+MENTION_SHARE = 0.05
+UNGROUPED_SHARE = 0.3
+
+
+def skewed(count, alpha):
+    """Накопленные веса закона Ципфа: k-й по популярности весит 1 / k^alpha."""
+    return list(accumulate(
+        1 / rank ** alpha for rank in range(1, count + 1)
+    ))
+
+
+def chunks(count, size):
+    for start in range(0, count, size):
+        yield range(start, min(start + size, count))
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Даёт bulk_create записать свои даты вместо auto_now_add."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def new_pks(model, last_pk):
+    return list(model.objects.filter(pk__gt=last_pk).order_by(
+        'pk'
+    ).values_list('pk', flat=True))
+
+
+def last_pk(model):
+    return model.objects.order_by('-pk').values_list(
+        'pk', flat=True
+    ).first() or 0
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками через bulk_create пачками. Подписки '
+        'и активность авторов распределены по степенному закону. '
+        'Счётчики, ленты, теги и поисковый индекс пересобираются в конце.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=200000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--alpha', type=float, default=1.2,
+            help='показатель степенного закона: больше — сильнее перекос',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='за сколько дней распределить даты постов',
+        )
+        parser.add_argument(
+            '--prefix', default='seed',
+            help='префикс имён пользователей и адресов групп',
+        )
+        parser.add_argument(
+            '--password', default=None,
+            help='общий пароль; без него войти под пользователями нельзя',
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь.')
+        prefix = options['prefix']
+        if (
+            User.objects.filter(username__startswith=prefix + '_').exists()
+            or Group.objects.filter(slug__startswith=prefix + '-').exists()
+        ):
+            raise CommandError(
+                'Данные с префиксом «{}» уже есть, укажите другой '
+                '--prefix.'.format(prefix)
+            )
+        self.options = options
+        self.batch_size = options['batch_size']
+        self.rng = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(options['seed'])
+        self.sentences = [
+            self.fake.sentence() for _ in range(SENTENCE_POOL)
+        ]
+        self.tags = list(dict.fromkeys(
+            self.fake.word() for _ in range(TAG_POOL)
+        ))
+        self.started = timezone.now()
+
+        user_ids = self.create_users(options['users'])
+        group_ids = self.create_groups(options['groups'])
+        post_ids = self.create_posts(options['posts'], user_ids, group_ids)
+        self.create_comments(options['comments'], user_ids, post_ids)
+        self.create_follows(options['follows'], user_ids)
+        self.rebuild(user_ids)
+        self.stdout.write('Готово.')
+
+    def report(self, name, count):
+        self.stdout.write('{}: {}'.format(name, count))
+
+    def create_users(self, count):
+        password = make_password(self.options['password'])
+        for numbers in chunks(count, self.batch_size):
+            User.objects.bulk_create(
+                User(
+                    username='{}_{}'.format(self.options['prefix'], number),
+                    first_name=self.fake.first_name(),
+                    last_name=self.fake.last_name(),
+                    email=self.fake.email(),
+                    password=password,
+                )
+                for number in numbers
+            )
+        user_ids = list(User.objects.filter(
+            username__startswith=self.options['prefix'] + '_'
+        ).order_by('pk').values_list('pk', flat=True))
+        self.report('Пользователей', len(user_ids))
+        return user_ids
+
+    def create_groups(self, count):
+        first = last_pk(Group)
+        Group.objects.bulk_create(
+            (
+                Group(
+                    title=self.fake.catch_phrase()[:200],
+                    slug='{}-{}'.format(self.options['prefix'], number),
+                    description=self.fake.paragraph(),
+                )
+                for number in range(count)
+            ),
+            batch_size=self.batch_size,
+        )
+        group_ids = new_pks(Group, first)
+        self.report('Групп', len(group_ids))
+        return group_ids
+
+    def post_date(self, index, count):
+        """Даты постов растут вместе с их номером, как на живом сайте."""
+        span = timedelta(days=self.options['days'])
+        return self.started - span + span * index / max(count, 1)
+
+    def post_text(self, user_count):
+        text = ' '.join(self.rng.sample(
+            self.sentences, self.rng.randint(1, 4)
+        ))
+        if self.rng.random() < TAGGED_SHARE:
+            text += ' #' + self.rng.choice(self.tags)
+        if self.rng.random() < MENTION_SHARE:
+            text += ' @{}_{}'.format(
+                self.options['prefix'], self.rng.randrange(user_count)
+            )
+        return text
+
+    def create_posts(self, count, user_ids, group_ids):
+        authors = self.ranked(user_ids)
+        author_weights = skewed(len(authors), self.options['alpha'])
+        group_weights = skewed(len(group_ids), self.options['alpha'])
+        post_ids = []
+        for numbers in chunks(count, self.batch_size):
+            posts = [
+                Post(
+                    text=self.post_text(len(user_ids)),
+                    pub_date=self.post_date(number, count),
+                    author_id=author_id,
+                    group_id=self.pick_group(group_ids, group_weights),
+                )
+                for number, author_id in zip(numbers, self.rng.choices(
+                    authors, cum_weights=author_weights, k=len(numbers)
+                ))
+            ]
+            with transaction.atomic(), explicit_dates(
+                Post._meta.get_field('pub_date')
+            ):
+                first = last_pk(Post)
+                Post.objects.bulk_create(posts)
+                pks = new_pks(Post, first)
+                texts = dict(zip(pks, (post.text for post in posts)))
+                self.link(texts, user_ids)
+                write_terms({pk: terms(text) for pk, text in texts.items()})
+            post_ids += pks
+        self.report('Постов', len(post_ids))
+        return post_ids
+
+    def pick_group(self, group_ids, weights):
+        if not group_ids or self.rng.random() < UNGROUPED_SHARE:
+            return None
+        return self.rng.choices(group_ids, cum_weights=weights)[0]
+
+    def link(self, texts, user_ids):
+        """Теги и упоминания пачки постов, как их сохранил бы link_post."""
+        prefix = self.options['prefix'] + '_'
+        post_tags = {
+            pk: extract_tags(text) for pk, text in texts.items()
+        }
+        names = set().union(*post_tags.values())
+        Tag.objects.bulk_create(
+            (Tag(name=name) for name in names), ignore_conflicts=True
+        )
+        tag_ids = dict(
+            Tag.objects.filter(name__in=names).values_list('name', 'pk')
+        )
+        PostTag.objects.bulk_create(
+            PostTag(tag_id=tag_ids[name], post_id=pk)
+            for pk, tag_names in post_tags.items()
+            for name in tag_names
+        )
+        Mention.objects.bulk_create(
+            Mention(user_id=user_ids[int(name[len(prefix):])], post_id=pk)
+            for pk, text in texts.items()
+            for name in extract_mentions(text)
+            if name.startswith(prefix)
+        )
+
+    def create_comments(self, count, user_ids, post_ids):
+        authors = self.ranked(user_ids)
+        weights = skewed(len(authors), self.options['alpha'])
+        total = 0
+        for numbers in chunks(count if post_ids else 0, self.batch_size):
+            comments = []
+            for author_id in self.rng.choices(
+                authors, cum_weights=weights, k=len(numbers)
+            ):
+                index = self.rng.randrange(len(post_ids))
+                created = self.post_date(index, len(post_ids)) + timedelta(
+                    minutes=self.rng.randint(1, 60 * 24 * 3)
+                )
+                comments.append(Comment(
+                    post_id=post_ids[index],
+                    author_id=author_id,
+                    text=self.rng.choice(self.sentences),
+                    created=min(created, self.started),
+                ))
+            with transaction.atomic(), explicit_dates(
+                Comment._meta.get_field('created')
+            ):
+                Comment.objects.bulk_create(comments)
+            total += len(comments)
+        self.report('Комментариев', total)
+
+    def create_follows(self, count, user_ids):
+        """
+        Число подписок читателя и популярность автора — степенные:
+        немногие подписаны на сотни авторов, немногие авторы собирают
+        большую часть подписчиков.
+        """
+        alpha = self.options['alpha']
+        popular = self.ranked(user_ids)
+        weights = skewed(len(popular), alpha)
+        raw = [self.rng.paretovariate(alpha) for _ in user_ids]
+        scale = count / sum(raw)
+        follows, total = [], 0
+        for user_id, degree in zip(user_ids, raw):
+            degree = min(len(user_ids) - 1, round(degree * scale))
+            authors = set()
+            for _ in range(3):
+                if len(authors) >= degree:
+                    break
+                authors.update(self.rng.choices(
+                    popular, cum_weights=weights, k=degree - len(authors)
+                ))
+                authors.discard(user_id)
+            follows += (
+                Follow(user_id=user_id, author_id=author_id)
+                for author_id in sorted(authors)
+            )
+            if len(follows) >= self.batch_size:
+                total += self.save_follows(follows)
+                follows = []
+        total += self.save_follows(follows)
+        self.report('Подписок', total)
+
+    @staticmethod
+    def save_follows(follows):
+        with transaction.atomic():
+            Follow.objects.bulk_create(follows)
+        return len(follows)
+
+    def ranked(self, ids):
+        """Порядок популярности, не связанный с порядком создания."""
+        ids = list(ids)
+        self.rng.shuffle(ids)
+        return ids
+
+    def rebuild(self, user_ids):
+        """bulk_create обходит сигналы: производные данные строим сами."""
+        threshold = settings.TIMELINE_FANOUT_THRESHOLD
+        for numbers in chunks(len(user_ids), self.batch_size):
+            batch = user_ids[numbers.start:numbers.stop]
+            with transaction.atomic():
+                recount(batch)
+                CelebrityAuthor.objects.bulk_create(
+                    (
+                        CelebrityAuthor(author_id=author_id)
+                        for author_id in UserStats.objects.filter(
+                            user_id__in=batch,
+                            followers_count__gte=threshold,
+                        ).values_list('user_id', flat=True)
+                    ),
+                    ignore_conflicts=True,
+                )
+        self.report('Пересчитана статистика пользователей', len(user_ids))
+        authors = list(UserStats.objects.filter(
+            user_id__in=user_ids,
+            posts_count__gt=0,
+            followers_count__gt=0,
+            followers_count__lt=threshold,
+        ).values_list('user_id', flat=True))
+        for author_id in authors:
+            with transaction.atomic():
+                fan_out_author(author_id)
+        self.report('Разложены ленты авторов', len(authors))
+        names = {normalize_tag(name) for name in self.tags}
+        for tag in Tag.objects.filter(name__in=names).annotate(
+            count=Count('post_tags')
+        ):
+            Tag.objects.filter(pk=tag.pk).update(posts_count=tag.count)
+        drop_count(ALL_POSTS)
+        bump_feed_version()
@@ -0,0 +1,99 @@
+import sys
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.metrics import percentile
+from posts.models import Follow
+from posts.timeline import update_celebrity
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает p50/p99 post_create и follow_index при чистой раскладке '
+        'по лентам и при гибридной. Данные создаются в транзакции, '
+        'которая затем откатывается.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--followers', type=int, nargs='+',
+            default=[1000, 10000, 100000],
+        )
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument(
+            '--threshold', type=int,
+            default=settings.TIMELINE_FANOUT_THRESHOLD,
+        )
+
+    def handle(self, *args, **options):
+        strategies = (
+            ('fan-out', sys.maxsize),
+            ('hybrid', options['threshold']),
+        )
+        self.stdout.write(
+            '{:<8} {:>9} {:>14} {:>14} {:>14} {:>14}'.format(
+                'strategy', 'followers',
+                'create p50 ms', 'create p99 ms',
+                'follow p50 ms', 'follow p99 ms',
+            )
+        )
+        for followers in options['followers']:
+            for name, threshold in strategies:
+                with override_settings(TIMELINE_FANOUT_THRESHOLD=threshold):
+                    create, read = self.run(followers, options['runs'])
+                self.stdout.write(
+                    '{:<8} {:>9} {:>14.1f} {:>14.1f} {:>14.1f} {:>14.1f}'
+                    .format(
+                        name, followers,
+                        percentile(create, 50), percentile(create, 99),
+                        percentile(read, 50), percentile(read, 99),
+                    )
+                )
+
+    def run(self, followers, runs):
+        with transaction.atomic():
+            author = User.objects.create_user(username='bench_author')
+            User.objects.bulk_create(
+                User(username='bench_follower_{}'.format(i))
+                for i in range(followers)
+            )
+            readers = User.objects.filter(
+                username__startswith='bench_follower_'
+            )
+            Follow.objects.bulk_create(
+                Follow(user_id=user_id, author=author)
+                for user_id in readers.values_list('pk', flat=True)
+            )
+            update_celebrity(author.pk)
+            writer = Client()
+            writer.force_login(author)
+            reader = Client()
+            reader.force_login(readers.first())
+            create = self.measure(
+                runs,
+                lambda: writer.post(
+                    reverse('posts:post_create'), {'text': 'Benchmark'}
+                )
+            )
+            read = self.measure(
+                runs, lambda: reader.get(reverse('posts:follow_index'))
+            )
+            transaction.set_rollback(True)
+        return create, read
+
+    @staticmethod
+    def measure(runs, request):
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            request()
+            samples.append((time.perf_counter() - started) * 1000)
+        return samples
@@ -0,0 +1,38 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:38
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def mark_celebrities(apps, schema_editor):
+    CelebrityAuthor = apps.get_model('posts', 'CelebrityAuthor')
+    Follow = apps.get_model('posts', 'Follow')
+    authors = Follow.objects.values('author').annotate(
+        followers=models.Count('id')
+    ).filter(followers__gte=settings.TIMELINE_FANOUT_THRESHOLD)
+    CelebrityAuthor.objects.bulk_create(
+        CelebrityAuthor(author_id=row['author']) for row in authors
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0015_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CelebrityAuthor',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='celebrity', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+            ],
+            options={
+                'verbose_name': 'Популярный автор',
+                'verbose_name_plural': 'Популярные авторы',
+            },
+        ),
+        migrations.RunPython(mark_celebrities, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:54
+
+from django.db import migrations, models
+import posts.storage
+
+
+def count_blobs(apps, schema_editor):
+    ImageBlob = apps.get_model('posts', 'ImageBlob')
+    Post = apps.get_model('posts', 'Post')
+    rows = Post.objects.exclude(image='').values('image').annotate(
+        refs=models.Count('id')
+    ).order_by()
+    ImageBlob.objects.bulk_create(
+        ImageBlob(name=row['image'], refs=row['refs']) for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_comment_ordering'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Файл')),
+                ('refs', models.IntegerField(default=0, verbose_name='Ссылок')),
+            ],
+            options={
+                'verbose_name': 'Файл картинки',
+                'verbose_name_plural': 'Файлы картинок',
+            },
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=posts.storage.ContentHashStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.RunPython(count_blobs, migrations.RunPython.noop),
+    ]
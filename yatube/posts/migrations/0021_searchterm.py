@@ -0,0 +1,189 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:56
+
+import re
+from collections import Counter
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Копия posts.stemmer и posts.search.terms на момент миграции: код
+# приложения может поменяться, а миграция должна давать тот же индекс
+
+WORD = re.compile(r'\w+')
+TERM_MAX_LENGTH = 64
+STOP_WORDS = frozenset((
+    'и', 'в', 'во', 'не', 'что', 'он', 'на', 'я', 'с', 'со', 'как', 'а',
+    'то', 'все', 'она', 'так', 'его', 'но', 'да', 'ты', 'к', 'у', 'же',
+    'вы', 'за', 'бы', 'по', 'только', 'ее', 'мне', 'было', 'вот', 'от',
+    'меня', 'о', 'из', 'ему', 'ли', 'если', 'или', 'ни', 'быть', 'был',
+    'до', 'для', 'мы', 'их', 'это', 'при', 'без', 'под', 'над', 'об',
+))
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ('ся', 'сь')
+VERB = (
+    (
+        'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но',
+        'ет', 'ют', 'ны', 'ть', 'ешь', 'нно',
+    ),
+    (
+        'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей',
+        'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят',
+        'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю',
+    ),
+)
+NOUN = (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+    'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+    'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+    'ья', 'я',
+)
+DERIVATIONAL = ('ост', 'ость')
+SUPERLATIVE = ('ейш', 'ейше')
+
+CYRILLIC = re.compile('^[а-я]+$')
+
+
+def _longest(word, suffixes):
+    for suffix in sorted(suffixes, key=len, reverse=True):
+        if word.endswith(suffix):
+            return suffix
+    return None
+
+
+def _strip(word, groups):
+    """
+    Отрезает самое длинное окончание из групп.
+
+    Окончания первой группы засчитываются, только если перед ними
+    стоит «а» или «я».
+    """
+    first, second = groups
+    best = None
+    for suffix in first:
+        if word[:-len(suffix)].endswith(('а', 'я')) and word.endswith(suffix):
+            if best is None or len(suffix) > len(best):
+                best = suffix
+    suffix = _longest(word, second)
+    if suffix and (best is None or len(suffix) > len(best)):
+        best = suffix
+    if best is None:
+        return None
+    return word[:-len(best)]
+
+
+def _region(word, start=0):
+    """Позиция после первой пары «гласная, согласная» начиная с start."""
+    for index in range(start + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            return index + 1
+    return len(word)
+
+
+def _step_one(rv):
+    stripped = _strip(rv, PERFECTIVE_GERUND)
+    if stripped is not None:
+        return stripped
+    suffix = _longest(rv, REFLEXIVE)
+    if suffix:
+        rv = rv[:-len(suffix)]
+    suffix = _longest(rv, ADJECTIVE)
+    if suffix:
+        rv = rv[:-len(suffix)]
+        stripped = _strip(rv, PARTICIPLE)
+        return rv if stripped is None else stripped
+    stripped = _strip(rv, VERB)
+    if stripped is not None:
+        return stripped
+    suffix = _longest(rv, NOUN)
+    return rv[:-len(suffix)] if suffix else rv
+
+
+def _step_four(rv):
+    if rv.endswith('нн'):
+        return rv[:-1]
+    suffix = _longest(rv, SUPERLATIVE)
+    if suffix:
+        rv = rv[:-len(suffix)]
+        return rv[:-1] if rv.endswith('нн') else rv
+    return rv[:-1] if rv.endswith('ь') else rv
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    if not CYRILLIC.match(word):
+        return word
+    rv_start = next(
+        (index + 1 for index, char in enumerate(word) if char in VOWELS),
+        len(word)
+    )
+    r2 = _region(word, _region(word))
+    prefix, rv = word[:rv_start], word[rv_start:]
+    rv = _step_one(rv)
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    # Словообразовательный суффикс снимается, только если он целиком в R2
+    suffix = _longest(rv, DERIVATIONAL)
+    if suffix and rv_start + len(rv) - len(suffix) >= r2:
+        rv = rv[:-len(suffix)]
+    return prefix + _step_four(rv)
+
+
+def terms(text):
+    return Counter(
+        stem(word)[:TERM_MAX_LENGTH]
+        for word in WORD.findall(text.lower().replace('ё', 'е'))
+        if word not in STOP_WORDS and not word.isdigit()
+    )
+
+
+def index_posts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+    for post in Post.objects.only('text').iterator():
+        SearchTerm.objects.bulk_create(
+            SearchTerm(term=term, post=post, weight=weight)
+            for term, weight in terms(post.text).items()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_imageblob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Основа слова')),
+                ('weight', models.IntegerField(default=1, verbose_name='Вес')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Термин поиска',
+                'verbose_name_plural': 'Термины поиска',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='unique_search_term'),
+        ),
+        migrations.RunPython(index_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_searchterm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchQueueEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_id', models.IntegerField(db_index=True, verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Пост в очереди индексации',
+                'verbose_name_plural': 'Очередь индексации',
+            },
+        ),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:01
+
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Копия разбора из posts.tags на момент миграции: код приложения может
+# поменяться, а миграция должна связывать посты так же, как сейчас
+TAG_MAX_LENGTH = 64
+TAG = re.compile(r'(?<![\w&#])#(\w+)')
+MENTION = re.compile(r'(?<![\w@])@([\w.+-]+)')
+
+
+def extract_tags(text):
+    return {
+        name.lower().replace('ё', 'е')[:TAG_MAX_LENGTH]
+        for name in TAG.findall(text)
+    }
+
+
+def extract_mentions(text):
+    return {name.rstrip('.') for name in MENTION.findall(text)} - {''}
+
+
+def link_posts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Tag = apps.get_model('posts', 'Tag')
+    PostTag = apps.get_model('posts', 'PostTag')
+    Mention = apps.get_model('posts', 'Mention')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    tag_ids = {}
+    for post in Post.objects.only('text').iterator():
+        for name in extract_tags(post.text):
+            if name not in tag_ids:
+                tag_ids[name] = Tag.objects.create(name=name).pk
+            PostTag.objects.create(tag_id=tag_ids[name], post=post)
+        Mention.objects.bulk_create(
+            Mention(user_id=user_id, post=post)
+            for user_id in User.objects.filter(
+                username__in=extract_mentions(post.text)
+            ).values_list('pk', flat=True)
+        )
+    for tag in Tag.objects.annotate(count=models.Count('post_tags')):
+        Tag.objects.filter(pk=tag.pk).update(posts_count=tag.count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0022_searchqueueentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True, verbose_name='Тег')),
+                ('posts_count', models.IntegerField(default=0, verbose_name='Постов')),
+            ],
+            options={
+                'verbose_name': 'Тег',
+                'verbose_name_plural': 'Теги',
+            },
+        ),
+        migrations.CreateModel(
+            name='PostTag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_tags', to='posts.Post', verbose_name='Пост')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_tags', to='posts.Tag', verbose_name='Тег')),
+            ],
+            options={
+                'verbose_name': 'Тег поста',
+                'verbose_name_plural': 'Теги постов',
+            },
+        ),
+        migrations.CreateModel(
+            name='Mention',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to='posts.Post', verbose_name='Пост')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to=settings.AUTH_USER_MODEL, verbose_name='Упомянутый пользователь')),
+            ],
+            options={
+                'verbose_name': 'Упоминание',
+                'verbose_name_plural': 'Упоминания',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='posttag',
+            constraint=models.UniqueConstraint(fields=('tag', 'post'), name='unique_post_tag'),
+        ),
+        migrations.AddConstraint(
+            model_name='mention',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_mention'),
+        ),
+        migrations.RunPython(link_posts, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import content_storage
+
 User = get_user_model()
 
 
@@ -17,6 +19,27 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """
+        Посты с автором и группой, загруженными одним запросом.
+        Упоминания страницы подгружаются ещё одним запросом на всю страницу.
+        """
+        return self.select_related('author', 'group').only(
+            'text',
+            'pub_date',
+            'image',
+            'author__username',
+            'group__slug',
+            'group__title',
+        ).prefetch_related(models.Prefetch(
+            'mentions',
+            queryset=Mention.objects.select_related('user').only(
+                'post', 'user__username'
+            )
+        ))
+
+
 class Post(models.Model):
     text = models.TextField(verbose_name='Содержимое')
     pub_date = models.DateTimeField(
@@ -40,17 +63,39 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=content_storage,
         blank=True
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    @property
+    def mentioned_usernames(self):
+        """Имена пользователей, на которых есть строки Mention."""
+        return {mention.user.username for mention in self.mentions.all()}
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -71,6 +116,15 @@ class Comment(models.Model):
         verbose_name='Дата публикации комментария'
     )
 
+    class Meta:
+        ordering = ('created', 'id')
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created'
+            ),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -93,9 +147,220 @@ class Follow(models.Model):
         ]
 
 
-class Testing(models.Model):
-    text = models.TextField(verbose_name='hello')
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
     author = models.ForeignKey(
         User,
-        on_delete=models.CASCADE(),
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи ленты подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_post'
+            ),
+        ]
+
+
+class CelebrityAuthor(models.Model):
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='celebrity',
+        verbose_name='Автор'
+    )
+
+    class Meta:
+        verbose_name = 'Популярный автор'
+        verbose_name_plural = 'Популярные авторы'
+
+    def __str__(self):
+        return str(self.author_id)
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.IntegerField(default=0, verbose_name='Постов')
+    followers_count = models.IntegerField(
+        default=0,
+        verbose_name='Подписчиков'
+    )
+    following_count = models.IntegerField(default=0, verbose_name='Подписок')
+    comments_count = models.IntegerField(
+        default=0,
+        verbose_name='Комментариев'
+    )
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self):
+        return str(self.user_id)
+
+
+class FeedCounter(models.Model):
+    key = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name='Лента'
+    )
+    value = models.IntegerField(
+        default=0,
+        verbose_name='Количество постов'
+    )
+
+    class Meta:
+        verbose_name = 'Счётчик ленты'
+        verbose_name_plural = 'Счётчики лент'
+
+    def __str__(self):
+        return '{}: {}'.format(self.key, self.value)
+
+
+class ImageBlob(models.Model):
+    name = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name='Файл'
+    )
+    refs = models.IntegerField(default=0, verbose_name='Ссылок')
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+
+    def __str__(self):
+        return self.name
+
+
+class SearchTerm(models.Model):
+    term = models.CharField(max_length=64, verbose_name='Основа слова')
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name='Пост'
+    )
+    weight = models.IntegerField(default=1, verbose_name='Вес')
+
+    class Meta:
+        verbose_name = 'Термин поиска'
+        verbose_name_plural = 'Термины поиска'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'post'],
+                name='unique_search_term'
+            ),
+        ]
+
+    def __str__(self):
+        return self.term
+
+
+class SearchQueueEntry(models.Model):
+    post_id = models.IntegerField(db_index=True, verbose_name='Пост')
+
+    class Meta:
+        verbose_name = 'Пост в очереди индексации'
+        verbose_name_plural = 'Очередь индексации'
+
+    def __str__(self):
+        return str(self.post_id)
+
+
+class Tag(models.Model):
+    name = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name='Тег'
+    )
+    posts_count = models.IntegerField(default=0, verbose_name='Постов')
+
+    class Meta:
+        verbose_name = 'Тег'
+        verbose_name_plural = 'Теги'
+
+    def __str__(self):
+        return self.name
+
+
+class PostTag(models.Model):
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='post_tags',
+        verbose_name='Тег'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='post_tags',
+        verbose_name='Пост'
+    )
+
+    class Meta:
+        verbose_name = 'Тег поста'
+        verbose_name_plural = 'Теги постов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tag', 'post'],
+                name='unique_post_tag'
+            ),
+        ]
+
+
+class Mention(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='mentions',
+        verbose_name='Упомянутый пользователь'
     )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='mentions',
+        verbose_name='Пост'
+    )
+
+    class Meta:
+        verbose_name = 'Упоминание'
+        verbose_name_plural = 'Упоминания'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_mention'
+            ),
+        ]
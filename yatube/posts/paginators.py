@@ -0,0 +1,176 @@
+import binascii
+import collections.abc
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPage(collections.abc.Sequence):
+    """Страница ленты, построенная по курсору, а не по номеру."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page of {} objects>'.format(len(self.object_list))
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Keyset-пагинация по паре полей, например (pub_date, id).
+    Первым полем может быть и числовая аннотация запроса.
+
+    Вместо COUNT(*) и OFFSET каждая страница выбирается условием
+    «строго после последней записи предыдущей страницы», поэтому её
+    стоимость не зависит от глубины.
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-pk')):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = ordering
+        self.fields = [name.lstrip('-') for name in ordering]
+        self.descending = ordering[0].startswith('-')
+
+    def encode_cursor(self, obj, reverse=False):
+        values = [self._dump(obj, name) for name in self.fields]
+        return urlsafe_base64_encode(
+            json.dumps({'v': values, 'r': reverse}).encode()
+        )
+
+    def decode_cursor(self, cursor):
+        try:
+            data = json.loads(urlsafe_base64_decode(cursor).decode())
+            values = [
+                self._load(name, value)
+                for name, value in zip(self.fields, data['v'])
+            ]
+            reverse = bool(data['r'])
+        except (
+            binascii.Error, UnicodeDecodeError, ValueError,
+            KeyError, TypeError, ValidationError,
+        ):
+            raise InvalidCursor(cursor)
+        if len(values) != len(self.fields):
+            raise InvalidCursor(cursor)
+        return values, reverse
+
+    def read_cursor(self, cursor):
+        """Значения и направление курсора; битый или пустой курсор — начало."""
+        if cursor:
+            try:
+                return self.decode_cursor(cursor)
+            except InvalidCursor:
+                pass
+        return None, False
+
+    def page_queryset(self, cursor):
+        """Запрос страницы без LIMIT; битый или пустой курсор — начало."""
+        values, reverse = self.read_cursor(cursor)
+        return self.ordered_queryset(values, reverse), values, reverse
+
+    def ordered_queryset(self, values, reverse):
+        queryset = self.object_list
+        ordering = self.ordering
+        if reverse:
+            ordering = [self._flip(name) for name in ordering]
+        if values is not None:
+            queryset = queryset.filter(self._after(values, reverse))
+        return queryset.order_by(*ordering)
+
+    def fetch(self, values, reverse):
+        """Записи страницы и ещё одна — признак того, что дальше есть ещё."""
+        return list(
+            self.ordered_queryset(values, reverse)[:self.per_page + 1]
+        )
+
+    def get_page(self, cursor):
+        """Возвращает страницу; битый или пустой курсор — первая страница."""
+        values, reverse = self.read_cursor(cursor)
+        items = self.fetch(values, reverse)
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if reverse:
+            items.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+        return CursorPage(
+            items,
+            self,
+            next_cursor=(
+                self.encode_cursor(items[-1])
+                if has_next and items else None
+            ),
+            previous_cursor=(
+                self.encode_cursor(items[0], reverse=True)
+                if has_previous and items else None
+            ),
+        )
+
+    def _field(self, name):
+        meta = self.object_list.model._meta
+        if name == 'pk':
+            return meta.pk
+        try:
+            return meta.get_field(name)
+        except FieldDoesNotExist:
+            # Аннотация запроса, например релевантность поиска
+            return None
+
+    def _dump(self, obj, name):
+        field = self._field(name)
+        if name == 'pk':
+            return str(obj.pk)
+        if field is None:
+            return getattr(obj, name)
+        return field.value_to_string(obj)
+
+    def _load(self, name, value):
+        field = self._field(name)
+        if field is not None:
+            return field.to_python(value)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(value)
+        return value
+
+    def _after(self, values, reverse):
+        lookup = 'lt' if self.descending != reverse else 'gt'
+        first, second = self.fields
+        return (
+            Q(**{'{}__{}'.format(first, lookup): values[0]})
+            | Q(**{
+                first: values[0],
+                '{}__{}'.format(second, lookup): values[1],
+            })
+        )
+
+    @staticmethod
+    def _flip(name):
+        return name[1:] if name.startswith('-') else '-' + name
@@ -0,0 +1,140 @@
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (Exists, IntegerField, OuterRef, Subquery, Sum,
+                              Value)
+
+from .models import Post, SearchQueueEntry, SearchTerm
+from .stemmer import stem
+
+WORD = re.compile(r'\w+')
+TERM_MAX_LENGTH = SearchTerm._meta.get_field('term').max_length
+# Больше слов в запросе не учитываем: каждое — ещё один подзапрос
+QUERY_MAX_TERMS = 8
+STOP_WORDS = frozenset((
+    'и', 'в', 'во', 'не', 'что', 'он', 'на', 'я', 'с', 'со', 'как', 'а',
+    'то', 'все', 'она', 'так', 'его', 'но', 'да', 'ты', 'к', 'у', 'же',
+    'вы', 'за', 'бы', 'по', 'только', 'ее', 'мне', 'было', 'вот', 'от',
+    'меня', 'о', 'из', 'ему', 'ли', 'если', 'или', 'ни', 'быть', 'был',
+    'до', 'для', 'мы', 'их', 'это', 'при', 'без', 'под', 'над', 'об',
+))
+
+
+def terms(text):
+    """Счётчик основ слов текста без стоп-слов."""
+    return Counter(
+        stem(word)[:TERM_MAX_LENGTH]
+        for word in WORD.findall(text.lower().replace('ё', 'е'))
+        if word not in STOP_WORDS and not word.isdigit()
+    )
+
+
+def query_terms(query):
+    return list(terms(query))[:QUERY_MAX_TERMS]
+
+
+def write_terms(post_terms):
+    """Заменяет термины постов: {post_id: Counter основ}."""
+    SearchTerm.objects.filter(post_id__in=list(post_terms)).delete()
+    SearchTerm.objects.bulk_create(
+        SearchTerm(term=term, post_id=post_id, weight=weight)
+        for post_id, counter in post_terms.items()
+        for term, weight in counter.items()
+    )
+
+
+def index_posts(post_ids):
+    """Перестраивает термины постов; удалённые посты пропускаются."""
+    texts = Post.objects.filter(pk__in=post_ids).values_list('pk', 'text')
+    write_terms({pk: terms(text) for pk, text in texts})
+
+
+def enqueue(post_id):
+    """
+    Ставит пост в очередь. Разбирает её команда process_search_queue,
+    а не запрос, который сохранил пост.
+    """
+    SearchQueueEntry.objects.create(post_id=post_id)
+
+
+def flush_queue(batch_size=None, limit=None):
+    """
+    Разбирает очередь пачками и возвращает число обработанных записей.
+
+    Каждая пачка — не больше batch_size записей, забранных под
+    блокировкой в своей транзакции; записи, уже забранные другим
+    воркером, пропускаются. Удаляются только забранные записи, поэтому
+    правка, поставленная в очередь во время разбора, не теряется.
+    limit ограничивает число записей за один вызов.
+    """
+    batch_size = batch_size or settings.SEARCH_INDEX_BATCH_SIZE
+    done = 0
+    while limit is None or done < limit:
+        size = batch_size if limit is None else min(batch_size, limit - done)
+        with transaction.atomic():
+            entries = list(
+                SearchQueueEntry.objects.select_for_update(
+                    skip_locked=True
+                ).order_by('pk').values_list('pk', 'post_id')[:size]
+            )
+            if not entries:
+                break
+            index_posts({post_id for _, post_id in entries})
+            SearchQueueEntry.objects.filter(
+                pk__in=[pk for pk, _ in entries]
+            ).delete()
+        done += len(entries)
+    return done
+
+
+def rarest_term(query):
+    """
+    Слово запроса с наименьшим числом постов. Постинги считаются
+    по индексу (term, post) не дальше SEARCH_TERM_COUNT_LIMIT строк:
+    частые слова дальше сравнивать незачем.
+    """
+    limit = settings.SEARCH_TERM_COUNT_LIMIT
+    counts = {
+        term: SearchTerm.objects.filter(term=term)[:limit].count()
+        for term in query
+    }
+    return min(query, key=counts.get), counts
+
+
+def search_posts(query):
+    """
+    Посты, содержащие все слова запроса, с релевантностью в rank.
+
+    rank — сумма частот найденных основ в тексте поста. Поиск идёт от
+    самого редкого слова: кандидаты — его посты, остальные слова
+    проверяются по индексу (term, post) для каждого кандидата, поэтому
+    страница выдачи стоит столько, сколько постов у редкого слова.
+    """
+    query = query_terms(query)
+    if not query:
+        return Post.objects.none().annotate(
+            rank=Value(0, output_field=IntegerField())
+        )
+    rarest, counts = rarest_term(query)
+    if not counts[rarest]:
+        return Post.objects.none().annotate(
+            rank=Value(0, output_field=IntegerField())
+        )
+    posts = Post.objects.filter(pk__in=SearchTerm.objects.filter(
+        term=rarest
+    ).values('post_id'))
+    for number, term in enumerate(query):
+        if term == rarest:
+            continue
+        name = 'has_term_{}'.format(number)
+        posts = posts.annotate(**{name: Exists(SearchTerm.objects.filter(
+            term=term, post=OuterRef('pk')
+        ))}).filter(**{name: True})
+    return posts.annotate(rank=Subquery(
+        SearchTerm.objects.filter(
+            post=OuterRef('pk'), term__in=query
+        ).values('post').annotate(total=Sum('weight')).values('total'),
+        output_field=IntegerField()
+    ))
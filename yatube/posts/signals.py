@@ -0,0 +1,169 @@
+from django.db.models.signals import (
+    post_delete, post_init, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from .counters import (
+    ALL_POSTS, author_key, change_count, drop_count, group_key
+)
+from .feed_cache import bump_feed_version
+from .images import release_image, retain_image, schedule_thumbnails
+from .models import Comment, Follow, Group, Post
+from .search import enqueue
+from .stats import change_stats
+from .tags import link_post, unlink_post
+from .timeline import fan_out, follow_added, follow_removed
+
+
+@receiver(post_init, sender=Post)
+def remember_loaded_fields(sender, instance, **kwargs):
+    # group_id может быть отложен через only(): не подгружаем его ради счётчика
+    if 'group_id' in instance.__dict__:
+        instance._counted_group_id = instance.group_id
+    if 'image' in instance.__dict__:
+        instance._saved_image = instance.image.name
+    if 'text' in instance.__dict__:
+        instance._saved_text = instance.text
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    counted_group_id = getattr(
+        instance, '_counted_group_id', instance.group_id
+    )
+    if created:
+        change_count(ALL_POSTS, 1)
+        change_count(author_key(instance.author_id), 1)
+        if instance.group_id:
+            change_count(group_key(instance.group_id), 1)
+    elif instance.group_id != counted_group_id:
+        if counted_group_id:
+            change_count(group_key(counted_group_id), -1)
+        if instance.group_id:
+            change_count(group_key(instance.group_id), 1)
+    instance._counted_group_id = instance.group_id
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    change_count(ALL_POSTS, -1)
+    change_count(author_key(instance.author_id), -1)
+    if instance.group_id:
+        change_count(group_key(instance.group_id), -1)
+
+
+@receiver(post_save, sender=Post)
+def parse_post_text(sender, instance, created, **kwargs):
+    if 'text' not in instance.__dict__:
+        return
+    if created or instance.text != getattr(instance, '_saved_text', None):
+        enqueue(instance.pk)
+        link_post(instance, created)
+    instance._saved_text = instance.text
+
+
+@receiver(pre_delete, sender=Post)
+def uncount_post_tags(sender, instance, **kwargs):
+    # После удаления связи с тегами уже убраны каскадом
+    unlink_post(instance)
+
+
+@receiver(post_delete, sender=Group)
+def drop_group_count(sender, instance, **kwargs):
+    drop_count(group_key(instance.pk))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_feeds(sender, **kwargs):
+    bump_feed_version()
+
+
+@receiver(post_save, sender=Post)
+def count_author_post(sender, instance, created, **kwargs):
+    if created:
+        change_stats(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_author_post(sender, instance, **kwargs):
+    change_stats(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        change_stats(instance.author_id, comments_count=1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    change_stats(instance.author_id, comments_count=-1)
+
+
+# Счётчики подписок подключены раньше лент: update_celebrity их читает
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    if created:
+        change_stats(instance.author_id, followers_count=1)
+        change_stats(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    change_stats(instance.author_id, followers_count=-1)
+    change_stats(instance.user_id, following_count=-1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        follow_added(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    follow_removed(instance.user_id, instance.author_id)
+
+
+@receiver(pre_save, sender=Post)
+def remember_image_upload(sender, instance, **kwargs):
+    # Ссылку на новый загруженный файл возьмёт ContentHashStorage.save
+    image = instance.image
+    instance._image_uploaded = bool(image) and not image._committed
+
+
+# Подключён раньше миниатюр: pregenerate_thumbnails обновляет _saved_image
+@receiver(post_save, sender=Post)
+def count_image_refs(sender, instance, created, **kwargs):
+    name = instance.image.name
+    saved = None if created else getattr(instance, '_saved_image', name)
+    uploaded = getattr(instance, '_image_uploaded', False)
+    if name == saved and not uploaded:
+        return
+    if name and not uploaded:
+        retain_image(name)
+    if saved:
+        release_image(saved)
+
+
+@receiver(post_delete, sender=Post)
+def release_post_image(sender, instance, **kwargs):
+    if instance.image.name:
+        release_image(instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+def pregenerate_thumbnails(sender, instance, created, **kwargs):
+    name = instance.image.name
+    if name and (created or name != getattr(instance, '_saved_image', None)):
+        schedule_thumbnails(name)
+    instance._saved_image = name
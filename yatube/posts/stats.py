@@ -0,0 +1,59 @@
+from django.db.models import Count, F
+
+from .models import Comment, Follow, Post, UserStats
+
+STATS_SOURCES = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+    'comments_count': (Comment, 'author'),
+}
+
+
+def recount(user_ids):
+    """Пересчитывает статистику пачки пользователей несколькими GROUP BY."""
+    user_ids = list(user_ids)
+    counts = {
+        field: dict(
+            model.objects.filter(**{'{}__in'.format(column): user_ids})
+            .values_list(column)
+            .annotate(Count('pk'))
+            .order_by()
+        )
+        for field, (model, column) in STATS_SOURCES.items()
+    }
+    existing = UserStats.objects.in_bulk(user_ids)
+    fresh = []
+    for user_id in user_ids:
+        stats = existing.get(user_id) or UserStats(user_id=user_id)
+        for field in STATS_SOURCES:
+            setattr(stats, field, counts[field].get(user_id, 0))
+        if user_id not in existing:
+            fresh.append(stats)
+    UserStats.objects.bulk_update(existing.values(), list(STATS_SOURCES))
+    UserStats.objects.bulk_create(fresh, ignore_conflicts=True)
+    return len(user_ids)
+
+
+def change_stats(user_id, **deltas):
+    # Отсутствующую строку не создаём: её полностью посчитает stats_for
+    UserStats.objects.filter(user_id=user_id).update(**{
+        field: F(field) + delta for field, delta in deltas.items()
+    })
+
+
+def stats_for(user_id):
+    """Статистика пользователя; строка создаётся при первом обращении."""
+    stats = UserStats.objects.filter(user_id=user_id).first()
+    if stats is None:
+        recount([user_id])
+        stats = UserStats.objects.get(user_id=user_id)
+    return stats
+
+
+def user_stats(user):
+    """То же, но без запроса, если статистика пришла через select_related."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return stats_for(user.pk)
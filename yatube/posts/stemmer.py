@@ -0,0 +1,128 @@
+"""Стеммер Портера для русского языка (алгоритм Snowball)."""
+import re
+from functools import lru_cache
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ('ся', 'сь')
+VERB = (
+    (
+        'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но',
+        'ет', 'ют', 'ны', 'ть', 'ешь', 'нно',
+    ),
+    (
+        'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей',
+        'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят',
+        'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю',
+    ),
+)
+NOUN = (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+    'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+    'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+    'ья', 'я',
+)
+DERIVATIONAL = ('ост', 'ость')
+SUPERLATIVE = ('ейш', 'ейше')
+
+CYRILLIC = re.compile('^[а-я]+$')
+
+
+def _longest(word, suffixes):
+    for suffix in sorted(suffixes, key=len, reverse=True):
+        if word.endswith(suffix):
+            return suffix
+    return None
+
+
+def _strip(word, groups):
+    """
+    Отрезает самое длинное окончание из групп.
+
+    Окончания первой группы засчитываются, только если перед ними
+    стоит «а» или «я».
+    """
+    first, second = groups
+    best = None
+    for suffix in first:
+        if word[:-len(suffix)].endswith(('а', 'я')) and word.endswith(suffix):
+            if best is None or len(suffix) > len(best):
+                best = suffix
+    suffix = _longest(word, second)
+    if suffix and (best is None or len(suffix) > len(best)):
+        best = suffix
+    if best is None:
+        return None
+    return word[:-len(best)]
+
+
+def _region(word, start=0):
+    """Позиция после первой пары «гласная, согласная» начиная с start."""
+    for index in range(start + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            return index + 1
+    return len(word)
+
+
+def _step_one(rv):
+    stripped = _strip(rv, PERFECTIVE_GERUND)
+    if stripped is not None:
+        return stripped
+    suffix = _longest(rv, REFLEXIVE)
+    if suffix:
+        rv = rv[:-len(suffix)]
+    suffix = _longest(rv, ADJECTIVE)
+    if suffix:
+        rv = rv[:-len(suffix)]
+        stripped = _strip(rv, PARTICIPLE)
+        return rv if stripped is None else stripped
+    stripped = _strip(rv, VERB)
+    if stripped is not None:
+        return stripped
+    suffix = _longest(rv, NOUN)
+    return rv[:-len(suffix)] if suffix else rv
+
+
+def _step_four(rv):
+    if rv.endswith('нн'):
+        return rv[:-1]
+    suffix = _longest(rv, SUPERLATIVE)
+    if suffix:
+        rv = rv[:-len(suffix)]
+        return rv[:-1] if rv.endswith('нн') else rv
+    return rv[:-1] if rv.endswith('ь') else rv
+
+
+# Словарь постов подчиняется закону Ципфа: частые слова стеммятся один раз
+@lru_cache(maxsize=65536)
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    if not CYRILLIC.match(word):
+        return word
+    rv_start = next(
+        (index + 1 for index, char in enumerate(word) if char in VOWELS),
+        len(word)
+    )
+    r2 = _region(word, _region(word))
+    prefix, rv = word[:rv_start], word[rv_start:]
+    rv = _step_one(rv)
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    # Словообразовательный суффикс снимается, только если он целиком в R2
+    suffix = _longest(rv, DERIVATIONAL)
+    if suffix and rv_start + len(rv) - len(suffix) >= r2:
+        rv = rv[:-len(suffix)]
+    return prefix + _step_four(rv)
@@ -0,0 +1,47 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentHashStorage(FileSystemStorage):
+    """
+    Хранилище, где имя файла — хеш его содержимого.
+
+    Одинаковые загрузки получают одно имя и хранятся один раз, а вместе
+    с именем у них общие и миниатюры sorl. Каталог из upload_to и
+    расширение сохраняются: posts/ab/abcdef….jpg. Каждое сохранение
+    учитывает ссылку на файл в ImageBlob.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        # Ссылка берётся до проверки: пока она есть, _delete_file не удалит
+        # файл, который мы сейчас решим не записывать
+        from .images import retain_image
+        retain_image(name)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+    @staticmethod
+    def hashed_name(name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(directory, digest[:2], digest + extension)
+
+
+content_storage = ContentHashStorage()
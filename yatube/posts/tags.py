@@ -0,0 +1,93 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.db.models import F
+
+from .models import Mention, Post, PostTag, Tag
+
+User = get_user_model()
+
+TAG_MAX_LENGTH = Tag._meta.get_field('name').max_length
+TAG = re.compile(r'(?<![\w&#])#(\w+)')
+MENTION = re.compile(r'(?<![\w@])@([\w.+-]+)')
+
+
+def normalize_tag(name):
+    return name.lower().replace('ё', 'е')[:TAG_MAX_LENGTH]
+
+
+def extract_tags(text):
+    return {normalize_tag(name) for name in TAG.findall(text)}
+
+
+def extract_mentions(text):
+    # Точка в конце — скорее конец предложения, чем часть имени
+    return {name.rstrip('.') for name in MENTION.findall(text)} - {''}
+
+
+def link_post(post, created=False):
+    """Сверяет теги и упоминания поста с его текстом."""
+    _link_tags(post, extract_tags(post.text), created)
+    _link_mentions(post, extract_mentions(post.text), created)
+
+
+def unlink_post(post):
+    """Снимает пост со счётчиков тегов перед удалением."""
+    Tag.objects.filter(post_tags__post=post).update(
+        posts_count=F('posts_count') - 1
+    )
+
+
+def _link_tags(post, names, created):
+    linked = {} if created else dict(
+        PostTag.objects.filter(post=post).values_list('tag__name', 'tag_id')
+    )
+    added = names - set(linked)
+    removed = [linked[name] for name in set(linked) - names]
+    if added:
+        Tag.objects.bulk_create(
+            (Tag(name=name) for name in added), ignore_conflicts=True
+        )
+        tag_ids = list(
+            Tag.objects.filter(name__in=added).values_list('pk', flat=True)
+        )
+        PostTag.objects.bulk_create(
+            PostTag(tag_id=tag_id, post=post) for tag_id in tag_ids
+        )
+        Tag.objects.filter(pk__in=tag_ids).update(
+            posts_count=F('posts_count') + 1
+        )
+    if removed:
+        PostTag.objects.filter(post=post, tag_id__in=removed).delete()
+        Tag.objects.filter(pk__in=removed).update(
+            posts_count=F('posts_count') - 1
+        )
+
+
+def _link_mentions(post, usernames, created):
+    linked = set() if created else set(
+        Mention.objects.filter(post=post).values_list(
+            'user__username', flat=True
+        )
+    )
+    added = usernames - linked
+    removed = linked - usernames
+    if added:
+        Mention.objects.bulk_create(
+            Mention(user_id=user_id, post=post)
+            for user_id in User.objects.filter(
+                username__in=added
+            ).values_list('pk', flat=True)
+        )
+    if removed:
+        Mention.objects.filter(
+            post=post, user__username__in=removed
+        ).delete()
+
+
+def tagged_posts(tag):
+    return Post.objects.for_feed().filter(post_tags__tag=tag)
+
+
+def mentioning_posts(user):
+    return Post.objects.for_feed().filter(mentions__user=user)
@@ -0,0 +1,51 @@
+from itertools import groupby
+
+from django import template
+
+from posts.images import MIME_TYPES, built_variants
+
+register = template.Library()
+
+DEFAULT_SIZES = '(max-width: 992px) 100vw, 960px'
+
+
+@register.inclusion_tag('posts/includes/post_image.html')
+def post_image(image, sizes=DEFAULT_SIZES, css_class='card-img my-2'):
+    """
+    <picture> со srcset по готовым вариантам картинки поста.
+
+    Формат без готовых вариантов пропускается; если нет ни одного
+    варианта последнего формата, <img> показывает оригинал.
+    """
+    if not image:
+        return {}
+    sources = []
+    for image_format, variants in groupby(
+        built_variants(image), key=lambda variant: variant[0]
+    ):
+        ready = [
+            (width, geometry, url)
+            for _, width, geometry, url in variants if url
+        ]
+        if not ready:
+            sources.append(None)
+            continue
+        # Размеры берём из геометрии, не открывая файлы миниатюр
+        width, height = ready[-1][1].split('x')
+        sources.append({
+            'type': MIME_TYPES.get(image_format, ''),
+            'srcset': ', '.join(
+                '{} {}w'.format(url, size) for size, _, url in ready
+            ),
+            'src': ready[-1][2],
+            'width': width,
+            'height': height,
+        })
+    if not sources:
+        return {}
+    return {
+        'sources': [source for source in sources[:-1] if source],
+        'img': sources[-1] or {'src': image.url},
+        'sizes': sizes,
+        'css_class': css_class,
+    }
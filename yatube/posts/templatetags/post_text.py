@@ -0,0 +1,45 @@
+from django import template
+from django.urls import reverse
+from django.utils.html import conditional_escape, format_html
+from django.utils.safestring import mark_safe
+
+from posts.tags import MENTION, TAG, normalize_tag
+
+register = template.Library()
+
+
+def _tag_link(match):
+    return format_html(
+        '<a href="{}">#{}</a>',
+        reverse('posts:tag_posts', args=[normalize_tag(match.group(1))]),
+        match.group(1)
+    )
+
+
+def _mention_link(match, usernames):
+    username = match.group(1).rstrip('.')
+    if username not in usernames:
+        return match.group(0)
+    return format_html(
+        '<a href="{}">@{}</a>{}',
+        reverse('posts:profile', args=[username]),
+        username,
+        match.group(1)[len(username):]
+    )
+
+
+@register.filter(needs_autoescape=True)
+def post_links(text, usernames=(), autoescape=True):
+    """
+    Ссылки на страницы #тегов и профили @упомянутых.
+
+    Профилем становятся только имена из usernames — обычно
+    post.mentioned_usernames, то есть те, для которых есть Mention.
+    """
+    if autoescape:
+        text = conditional_escape(text)
+    # После экранирования в тексте нет «<», «>» и кавычек,
+    # поэтому замены не попадают внутрь разметки
+    text = TAG.sub(_tag_link, text)
+    text = MENTION.sub(lambda match: _mention_link(match, usernames), text)
+    return mark_safe(text)
@@ -0,0 +1,57 @@
+import json
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts.generator import generate
+from posts.models import Comment, Follow, Post
+
+
+class GeneratorTest(TestCase):
+    def test_volumes(self):
+        generate(users=4, groups=2, posts=6, comments=5, follows=3)
+        self.assertEqual(Post.objects.count(), 6)
+        self.assertEqual(Comment.objects.count(), 5)
+        self.assertEqual(Follow.objects.count(), 3)
+
+    def test_same_seed_same_data(self):
+        texts = [
+            [post.text for post in generate(
+                users=2, groups=1, posts=3, comments=0, follows=0,
+                seed=7, prefix=prefix,
+            )[2]]
+            for prefix in ('first', 'second')
+        ]
+        self.assertEqual(texts[0], texts[1])
+
+
+class BenchmarkViewsTest(TestCase):
+    def test_json_report(self):
+        out = StringIO()
+        call_command(
+            'benchmark_views', users=3, groups=1, posts=4, comments=2,
+            follows=2, runs=2, stdout=out,
+        )
+        result = json.loads(out.getvalue())
+        self.assertEqual(result['meta']['volumes']['posts'], 4)
+        self.assertEqual(Post.objects.count(), 0)
+        for name in (
+            'index', 'group_posts', 'profile', 'post_detail',
+            'follow_index', 'post_create',
+        ):
+            with self.subTest(view=name):
+                view = result['views'][name]
+                self.assertIn(view['status'], (200, 302))
+                self.assertGreater(view['queries']['p50'], 0)
+                self.assertGreater(view['peak_alloc_bytes']['max'], 0)
+
+    @override_settings(DEBUG=True, QUERY_DETECTOR=True)
+    @mock.patch('core.middleware.ProblemReport')
+    def test_query_detector_is_off_while_measuring(self, report):
+        call_command(
+            'benchmark_views', users=2, groups=1, posts=2, comments=0,
+            follows=1, runs=1, stdout=StringIO(),
+        )
+        report.assert_not_called()
@@ -0,0 +1,63 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Post
+from posts.views import COMMENTS_ON_VIEW
+
+User = get_user_model()
+
+
+class CommentsPagingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_user')
+        cls.post = Post.objects.create(text='Text', author=cls.author)
+        for i in range(COMMENTS_ON_VIEW + 5):
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create_user(
+                    username='reader_{}'.format(i)
+                ),
+                text='Comment {}'.format(i)
+            )
+        cls.expected = list(cls.post.comments.all())
+
+    def test_post_detail_shows_first_batch(self):
+        comments = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        ).context['comments']
+        self.assertEqual(list(comments), self.expected[:COMMENTS_ON_VIEW])
+        self.assertTrue(comments.has_next())
+
+    def test_fragment_returns_next_batch(self):
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+        first = self.client.get(url).context['comments']
+        # Проверка поста и страница комментариев
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'comments': first.next_cursor})
+        self.assertTemplateUsed(response, 'posts/includes/comments.html')
+        self.assertEqual(
+            list(response.context['comments']),
+            self.expected[COMMENTS_ON_VIEW:]
+        )
+        self.assertNotContains(response, 'data-more-comments')
+
+    def test_missing_post_is_404(self):
+        missing = Post.objects.order_by('-pk').first().pk + 1
+        for params in ({}, {'format': 'json'}):
+            with self.subTest(params=params):
+                response = self.client.get(reverse(
+                    'posts:post_comments', kwargs={'post_id': missing}
+                ), params)
+                self.assertEqual(response.status_code, 404)
+
+    def test_fragment_as_json(self):
+        data = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk}),
+            {'format': 'json'}
+        ).json()
+        self.assertEqual(len(data['comments']), COMMENTS_ON_VIEW)
+        self.assertEqual(data['comments'][0]['author'], 'reader_0')
+        self.assertIsNotNone(data['next'])
@@ -0,0 +1,78 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.counters import ALL_POSTS, author_key, feed_count, group_key
+from posts.models import FeedCounter, Group, Post
+
+User = get_user_model()
+
+
+class FeedCounterTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(
+            title='TitleTest',
+            slug='test_slug',
+            description='Тестовый description'
+        )
+        cls.other_group = Group.objects.create(
+            title='OtherGroup',
+            slug='other',
+            description='Test description'
+        )
+
+    def counts(self):
+        return {
+            key: feed_count(key, queryset)
+            for key, queryset in (
+                (ALL_POSTS, Post.objects.all()),
+                (author_key(self.author.pk), self.author.posts.all()),
+                (group_key(self.group.pk), self.group.posts.all()),
+                (group_key(self.other_group.pk), self.other_group.posts.all()),
+            )
+        }
+
+    def expected(self, total, group, other_group):
+        return {
+            ALL_POSTS: total,
+            author_key(self.author.pk): total,
+            group_key(self.group.pk): group,
+            group_key(self.other_group.pk): other_group,
+        }
+
+    def test_counts_follow_writes(self):
+        self.assertEqual(self.counts(), self.expected(0, 0, 0))
+        post = Post.objects.create(
+            text='Text', author=self.author, group=self.group
+        )
+        Post.objects.create(text='Text', author=self.author)
+        self.assertEqual(self.counts(), self.expected(2, 1, 0))
+        post.group = self.other_group
+        post.save()
+        self.assertEqual(self.counts(), self.expected(2, 0, 1))
+        post.delete()
+        self.assertEqual(self.counts(), self.expected(1, 0, 0))
+
+    def test_paginator_reads_counter(self):
+        Post.objects.create(text='Text', author=self.author)
+        feed_count(ALL_POSTS, Post.objects.all())
+        FeedCounter.objects.filter(key=ALL_POSTS).update(value=42)
+        self.assertEqual(
+            self.client.get(
+                reverse('posts:index')
+            ).context['page_obj'].paginator.count,
+            42
+        )
+
+    def test_recount_feeds_repairs_drift(self):
+        Post.objects.create(text='Text', author=self.author, group=self.group)
+        self.counts()
+        FeedCounter.objects.update(value=42)
+        call_command('recount_feeds', stdout=StringIO())
+        self.assertEqual(self.counts(), self.expected(1, 1, 0))
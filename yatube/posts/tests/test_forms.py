@@ -2,8 +2,10 @@ import shutil
 import tempfile
 
 from posts.models import Post, Group, Comment
+from posts.storage import ContentHashStorage
 
 from django.conf import settings
+from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth import get_user_model
 from django.test import Client, TestCase, override_settings
@@ -32,6 +34,9 @@ class PostCreateFormTests(TestCase):
             b'\x02\x00\x01\x00\x00\x02\x02\x0C'
             b'\x0A\x00\x3B'
         )
+        cls.image_name = ContentHashStorage.hashed_name(
+            'posts/small.jpg', ContentFile(cls.small_jpg)
+        )
         cls.uploaded = SimpleUploadedFile(
             name='small.jpg',
             content=cls.small_jpg,
@@ -83,7 +88,7 @@ class PostCreateFormTests(TestCase):
         created_post_data = {
             'text': 'Тестовый текст',
             'group': self.group,
-            'image': 'posts/small.jpg',
+            'image': self.image_name,
             'author': self.author,
         }
         for field_name, expected_value in created_post_data.items():
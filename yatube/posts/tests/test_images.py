@@ -0,0 +1,276 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.forms import PostForm
+from posts.feed_cache import feed_version
+from posts.images import (generate_thumbnails, image_formats, image_variants,
+                          normalize_upload, pregenerate_upload)
+from posts.models import ImageBlob, Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+ORIENTATION = 0x0112
+
+
+def jpeg_upload(name='photo.jpg', size=(1200, 800), orientation=None):
+    content = BytesIO()
+    options = {}
+    if orientation:
+        exif = Image.Exif()
+        exif[ORIENTATION] = orientation
+        options['exif'] = exif.tobytes()
+    Image.new('RGB', size, (200, 30, 30)).save(content, 'JPEG', **options)
+    return SimpleUploadedFile(name, content.getvalue(), 'image/jpeg')
+
+
+def run_on_commit(callback):
+    callback()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailPregenerationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.author)
+        shutil.rmtree(
+            os.path.join(TEMP_MEDIA_ROOT, 'cache'),
+            ignore_errors=True
+        )
+        # Одинаковые картинки получают одно имя: сбрасываем записи sorl
+        cache.clear()
+
+    def thumbnails(self):
+        return [
+            name
+            for _, _, files in os.walk(os.path.join(TEMP_MEDIA_ROOT, 'cache'))
+            for name in files
+        ]
+
+    @mock.patch('posts.images.transaction.on_commit', run_on_commit)
+    def test_upload_through_form_builds_thumbnails(self):
+        self.client.post(
+            reverse('posts:post_create'),
+            {'text': 'With image', 'image': jpeg_upload()}
+        )
+        self.assertTrue(Post.objects.filter(text='With image').exists())
+        self.assertEqual(
+            len(self.thumbnails()),
+            len(image_variants())
+        )
+
+    def test_built_thumbnails_reset_cached_feeds(self):
+        post = Post.objects.create(
+            text='Fresh image',
+            author=self.author,
+            image=jpeg_upload('fresh.jpg')
+        )
+        # Фрагмент ленты успел закешироваться с исходной картинкой
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('/cache/', response.content.decode())
+        version = feed_version()
+        pregenerate_upload(post.image.name)
+        self.assertNotEqual(feed_version(), version)
+        response = self.client.get(reverse('posts:index'))
+        self.assertIn('/cache/', response.content.decode())
+
+    @mock.patch('posts.images.logger')
+    @mock.patch('posts.images.generate_thumbnails', side_effect=OSError)
+    def test_failed_build_keeps_cached_feeds(self, generate, logger):
+        version = feed_version()
+        pregenerate_upload('posts/broken.jpg')
+        self.assertEqual(feed_version(), version)
+        logger.exception.assert_called_once()
+
+    def test_command_backfills_existing_images(self):
+        Post.objects.create(
+            text='Old image',
+            author=self.author,
+            image=jpeg_upload('old.jpg')
+        )
+        self.assertEqual(self.thumbnails(), [])
+        call_command('generate_thumbnails', workers=0, stdout=StringIO())
+        self.assertEqual(
+            len(self.thumbnails()),
+            len(image_variants())
+        )
+
+    @override_settings(POST_IMAGE_FORMATS=('XYZ', 'JPEG'))
+    def test_unsupported_formats_are_skipped(self):
+        self.assertEqual(image_formats(), ('JPEG',))
+        self.assertEqual(
+            [geometry for _, _, geometry, _ in image_variants()],
+            ['320x113', '640x226', '960x339']
+        )
+
+    def test_post_image_tag_renders_srcset(self):
+        post = Post.objects.create(
+            text='Responsive',
+            author=self.author,
+            image=jpeg_upload('responsive.jpg')
+        )
+        generate_thumbnails(post.image.name)
+        cache.clear()
+        template = Template(
+            '{% load post_images %}{% post_image post.image %}'
+        )
+        # Все варианты ищутся в хранилище sorl одним запросом
+        with self.assertNumQueries(1):
+            html = template.render(Context({'post': post}))
+        for width in settings.POST_IMAGE_WIDTHS:
+            with self.subTest(width=width):
+                self.assertIn(' {}w'.format(width), html)
+        self.assertIn('sizes="', html)
+        self.assertIn('loading="lazy"', html)
+        self.assertEqual(html.count('<source'), len(image_formats()) - 1)
+
+    def test_missing_variants_fall_back_to_original(self):
+        post = Post.objects.create(
+            text='Not built yet',
+            author=self.author,
+            image=jpeg_upload('pending.jpg')
+        )
+        html = Template(
+            '{% load post_images %}{% post_image post.image %}'
+        ).render(Context({'post': post}))
+        self.assertIn('src="{}"'.format(post.image.url), html)
+        self.assertNotIn('<source', html)
+        self.assertNotIn('srcset', html)
+        self.assertEqual(self.thumbnails(), [])
+
+    def test_post_image_tag_without_image(self):
+        html = Template(
+            '{% load post_images %}{% post_image image %}'
+        ).render(Context({'image': None}))
+        self.assertNotIn('<img', html)
+
+
+@override_settings(POST_IMAGE_MAX_SIDE=400)
+class UploadNormalizationTest(TestCase):
+    def test_large_photo_is_rotated_downsized_and_stripped(self):
+        # Ориентация 6: камеру держали повёрнутой на 90°
+        upload = normalize_upload(
+            jpeg_upload('camera.jpg', size=(1600, 1200), orientation=6)
+        )
+        self.assertEqual(upload.name, 'camera.jpg')
+        image = Image.open(upload)
+        self.assertEqual(image.format, 'JPEG')
+        self.assertEqual(image.size, (300, 400))
+        self.assertNotIn(ORIENTATION, image.getexif())
+        upload.seek(0)
+        self.assertEqual(upload.size, len(upload.read()))
+
+    def test_small_clean_image_is_kept_as_is(self):
+        original = jpeg_upload('small.jpg', size=(100, 50))
+        content = original.read()
+        upload = normalize_upload(original)
+        self.assertIs(upload, original)
+        self.assertEqual(upload.read(), content)
+
+    def test_form_normalizes_upload(self):
+        form = PostForm(
+            {'text': 'Big photo'},
+            {'image': jpeg_upload('big.jpg', size=(2000, 1000))}
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        image = Image.open(form.cleaned_data['image'])
+        self.assertEqual(image.size, (400, 200))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+@mock.patch('posts.images.transaction.on_commit', run_on_commit)
+class ContentHashStorageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, name='photo.jpg', size=(300, 200)):
+        return Post.objects.create(
+            text='Post',
+            author=self.author,
+            image=jpeg_upload(name, size=size)
+        )
+
+    def stored(self, post):
+        return os.path.exists(os.path.join(TEMP_MEDIA_ROOT, post.image.name))
+
+    def test_same_content_is_stored_once(self):
+        first = self.create_post('first.jpg')
+        second = self.create_post('second.jpg')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.startswith('posts/'))
+        self.assertEqual(
+            ImageBlob.objects.get(name=first.image.name).refs, 2
+        )
+        self.assertNotEqual(
+            self.create_post(size=(200, 300)).image.name,
+            first.image.name
+        )
+
+    def test_last_reference_removes_file(self):
+        first = self.create_post()
+        second = self.create_post()
+        first.delete()
+        self.assertTrue(self.stored(second))
+        second.delete()
+        self.assertFalse(self.stored(second))
+        self.assertFalse(
+            ImageBlob.objects.filter(name=second.image.name).exists()
+        )
+
+    def test_upload_during_pending_delete_keeps_file(self):
+        post = self.create_post()
+        pending = []
+        with mock.patch(
+            'posts.images.transaction.on_commit', pending.append
+        ):
+            post.delete()
+        again = self.create_post()
+        for callback in pending:
+            callback()
+        self.assertTrue(self.stored(again))
+        self.assertEqual(ImageBlob.objects.get(name=again.image.name).refs, 1)
+
+    def test_reupload_of_same_content_keeps_one_reference(self):
+        post = self.create_post()
+        post.image = jpeg_upload('again.jpg')
+        post.save()
+        self.assertEqual(ImageBlob.objects.get(name=post.image.name).refs, 1)
+
+    def test_replaced_image_is_released(self):
+        post = self.create_post()
+        old_name = post.image.name
+        post.image = jpeg_upload('new.jpg', size=(100, 100))
+        post.save()
+        self.assertFalse(ImageBlob.objects.filter(name=old_name).exists())
+        self.assertEqual(ImageBlob.objects.get(name=post.image.name).refs, 1)
+        post.text = 'Edited'
+        post.save()
+        self.assertEqual(ImageBlob.objects.get(name=post.image.name).refs, 1)
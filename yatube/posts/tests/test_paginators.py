@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.core.paginator import Paginator
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.templatetags.pagination import elided_page_range
+from posts.models import Post
+from posts.paginators import CursorPaginator
+from posts.views import POSTS_ON_VIEW
+
+User = get_user_model()
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_user')
+        Post.objects.bulk_create(
+            Post(text='Post {}'.format(i), author=cls.author)
+            for i in range(POSTS_ON_VIEW * 2 + 3)
+        )
+        # Одинаковые даты проверяют, что порядок добивается по id
+        Post.objects.update(pub_date=timezone.now())
+        cls.expected = list(Post.objects.order_by('-pub_date', '-pk'))
+
+    def walk_forward(self, paginator):
+        pages = [paginator.get_page(None)]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        return pages
+
+    def test_pages_cover_feed_once(self):
+        pages = self.walk_forward(
+            CursorPaginator(Post.objects.all(), POSTS_ON_VIEW)
+        )
+        self.assertEqual(
+            [post for page in pages for post in page],
+            self.expected
+        )
+        self.assertEqual([len(page) for page in pages], [10, 10, 3])
+        self.assertFalse(pages[0].has_previous())
+        self.assertFalse(pages[-1].has_next())
+
+    def test_previous_cursor_returns_same_page(self):
+        paginator = CursorPaginator(Post.objects.all(), POSTS_ON_VIEW)
+        pages = self.walk_forward(paginator)
+        for page, previous in zip(pages[1:], pages):
+            with self.subTest(page=page):
+                self.assertEqual(
+                    list(paginator.get_page(page.previous_cursor)),
+                    list(previous)
+                )
+        self.assertFalse(
+            paginator.get_page(pages[1].previous_cursor).has_previous()
+        )
+
+    def test_invalid_cursor_gives_first_page(self):
+        paginator = CursorPaginator(Post.objects.all(), POSTS_ON_VIEW)
+        self.assertEqual(
+            list(paginator.get_page('not-a-cursor')),
+            self.expected[:POSTS_ON_VIEW]
+        )
+
+    def test_view_uses_cursor_parameter(self):
+        url = reverse('posts:profile', kwargs={'username': 'test_user'})
+        first = self.client.get(url + '?cursor=')
+        page_obj = first.context['page_obj']
+        self.assertTrue(page_obj.is_cursor)
+        self.assertContains(first, '?cursor=' + page_obj.next_cursor)
+        second = self.client.get(url, {'cursor': page_obj.next_cursor})
+        self.assertEqual(
+            list(second.context['page_obj']),
+            self.expected[POSTS_ON_VIEW:POSTS_ON_VIEW * 2]
+        )
+
+
+class ElidedRangeTest(TestCase):
+    def page(self, number, num_pages=100):
+        return Paginator(range(num_pages), 1).page(number)
+
+    def test_window_around_current_page(self):
+        cases = {
+            1: [1, 2, 3, None, 100],
+            5: [1, None, 3, 4, 5, 6, 7, None, 100],
+            50: [1, None, 48, 49, 50, 51, 52, None, 100],
+            100: [1, None, 98, 99, 100],
+        }
+        for number, expected in cases.items():
+            with self.subTest(number=number):
+                self.assertEqual(
+                    elided_page_range(self.page(number)),
+                    expected
+                )
+
+    def test_short_range_is_not_elided(self):
+        self.assertEqual(
+            elided_page_range(self.page(3, num_pages=7)),
+            list(range(1, 8))
+        )
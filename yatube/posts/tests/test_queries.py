@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core.testing import QueryAssertionsMixin
+from posts.models import Comment, Follow, Group, Post
+from posts.views import COMMENTS_ON_VIEW, POSTS_ON_VIEW
+
+User = get_user_model()
+
+# Не зависит от числа постов на странице: любой N+1 по автору, группе
+# или упоминаниям выводит ленту за бюджет. Упоминания страницы — один
+# запрос для ссылок на профили
+FEED_QUERY_BUDGET = 7
+
+
+class FeedQueryBudgetTest(QueryAssertionsMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(
+            title='TitleTest',
+            slug='test_slug',
+            description='Тестовый description'
+        )
+        cls.post = Post.objects.create(text='Text', author=cls.author)
+        authors = []
+        for i in range(POSTS_ON_VIEW):
+            author = User.objects.create_user(username='author_{}'.format(i))
+            group = Group.objects.create(
+                title='Group {}'.format(i),
+                slug='group_{}'.format(i),
+                description='Test description'
+            )
+            authors.append(author)
+            Follow.objects.create(user=cls.reader, author=author)
+            Post.objects.create(text='Text', author=author, group=group)
+            Post.objects.create(text='Text', author=cls.author, group=group)
+            Post.objects.create(text='Text', author=author, group=cls.group)
+        # Комментариев разных авторов больше, чем помещается на страницу
+        for i in range(COMMENTS_ON_VIEW + 1):
+            Comment.objects.create(
+                text='Comment', author=authors[i % len(authors)], post=cls.post
+            )
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def test_feeds_stay_within_query_budget(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'test_user'}),
+            reverse('posts:follow_index'),
+            reverse('posts:follow_index') + '?cursor=',
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                # Первый запрос заводит счётчик ленты
+                self.client.get(url)
+                cache.clear()
+                with self.assertMaxQueries(FEED_QUERY_BUDGET):
+                    response = self.client.get(url)
+                self.assertEqual(len(response.context['page_obj']), 10)
+
+    def test_post_detail_stays_within_query_budget(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        # Первый запрос заводит строку статистики автора
+        self.client.get(url)
+        with self.assertMaxQueries(FEED_QUERY_BUDGET):
+            response = self.client.get(url)
+        self.assertEqual(
+            len(response.context['comments']), COMMENTS_ON_VIEW
+        )
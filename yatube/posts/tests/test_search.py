@@ -0,0 +1,195 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, SearchQueueEntry, SearchTerm
+from posts import search
+from posts.search import flush_queue, search_posts, terms
+from posts.stemmer import stem
+from posts.views import POSTS_ON_VIEW
+
+User = get_user_model()
+
+
+class StemmerTest(TestCase):
+    def test_word_forms_share_stem(self):
+        groups = (
+            ('книга', 'книги', 'книгами', 'книгой'),
+            ('красивый', 'красивая', 'красивые', 'красивейший'),
+            ('писатель', 'писателями', 'писателя'),
+            ('ёлка', 'елки'),
+        )
+        for words in groups:
+            with self.subTest(words=words):
+                self.assertEqual(len({stem(word) for word in words}), 1)
+
+    def test_latin_words_are_kept(self):
+        self.assertEqual(stem('Django'), 'django')
+
+    def test_terms_skip_stop_words_and_numbers(self):
+        self.assertEqual(
+            terms('Книга и книги, 2021'),
+            {stem('книга'): 2}
+        )
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_user')
+        cls.both = Post.objects.create(
+            text='Кошка любит книги, а книги любят кошку',
+            author=cls.author
+        )
+        cls.cat = Post.objects.create(
+            text='Рыжая кошка спит',
+            author=cls.author
+        )
+        cls.book = Post.objects.create(
+            text='Новая книга вышла',
+            author=cls.author
+        )
+        flush_queue()
+
+    def test_index_follows_post_changes(self):
+        self.assertEqual(
+            set(search_posts('книгами')),
+            {self.both, self.book}
+        )
+        self.book.text = 'Новая повесть вышла'
+        self.book.save()
+        flush_queue()
+        self.assertEqual(list(search_posts('книгами')), [self.both])
+        self.assertEqual(list(search_posts('повести')), [self.book])
+        Post.objects.filter(pk=self.cat.pk).delete()
+        self.assertFalse(
+            SearchTerm.objects.filter(post_id=self.cat.pk).exists()
+        )
+
+    def test_all_words_must_match(self):
+        self.assertEqual(list(search_posts('кошка книга')), [self.both])
+        self.assertFalse(search_posts('и').exists())
+
+    @override_settings(SEARCH_TERM_COUNT_LIMIT=1)
+    def test_older_posts_match_behind_newer_ones(self):
+        for _ in range(3):
+            Post.objects.create(text='Кошка', author=self.author)
+            Post.objects.create(text='Книга', author=self.author)
+        flush_queue()
+        self.assertEqual(list(search_posts('кошка книга')), [self.both])
+        self.assertEqual(search_posts('кошка').count(), 5)
+
+    def test_view_ranks_results(self):
+        response = self.client.get(reverse('posts:search'), {'q': 'кошки'})
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [self.both, self.cat]
+        )
+        self.assertEqual(response.context['page_obj'][0].rank, 2)
+
+    def test_view_pages_keep_query(self):
+        for i in range(POSTS_ON_VIEW + 2):
+            Post.objects.create(
+                text='Про собак {}'.format(i),
+                author=self.author
+            )
+        flush_queue()
+        url = reverse('posts:search')
+        first = self.client.get(url, {'q': 'собака'})
+        page_obj = first.context['page_obj']
+        self.assertEqual(len(page_obj), POSTS_ON_VIEW)
+        self.assertContains(
+            first, '?q=%D1%81%D0%BE%D0%B1%D0%B0%D0%BA%D0%B0&amp;cursor='
+        )
+        second = self.client.get(
+            url, {'q': 'собака', 'cursor': page_obj.next_cursor}
+        )
+        self.assertEqual(len(second.context['page_obj']), 2)
+        self.assertFalse(
+            set(page_obj) & set(second.context['page_obj'])
+        )
+
+    def test_empty_query(self):
+        response = self.client.get(reverse('posts:search'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+
+class SearchQueueTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_user')
+
+    def create_posts(self, count, text='Весенний лес'):
+        return [
+            Post.objects.create(text=text, author=self.author)
+            for _ in range(count)
+        ]
+
+    def test_changes_wait_for_flush(self):
+        posts = self.create_posts(3)
+        self.assertEqual(SearchQueueEntry.objects.count(), 3)
+        self.assertFalse(search_posts('лес').exists())
+        self.assertEqual(flush_queue(batch_size=2), 3)
+        self.assertEqual(set(search_posts('лес')), set(posts))
+        self.assertFalse(SearchQueueEntry.objects.exists())
+
+    def test_flush_limit_leaves_the_rest_queued(self):
+        self.create_posts(3)
+        self.assertEqual(flush_queue(batch_size=2, limit=1), 1)
+        self.assertEqual(SearchQueueEntry.objects.count(), 2)
+
+    def test_process_command(self):
+        posts = self.create_posts(3)
+        out = StringIO()
+        call_command('process_search_queue', batch_size=2, stdout=out)
+        self.assertIn('3', out.getvalue())
+        self.assertEqual(set(search_posts('лес')), set(posts))
+        self.assertFalse(SearchQueueEntry.objects.exists())
+
+    def test_unchanged_text_is_not_queued(self):
+        post, = self.create_posts(1)
+        SearchQueueEntry.objects.all().delete()
+        post.group = None
+        post.save()
+        self.assertFalse(SearchQueueEntry.objects.exists())
+
+    def test_edit_during_flush_stays_queued(self):
+        post, = self.create_posts(1)
+        index_posts = search.index_posts
+        calls = []
+
+        def edit_while_indexing(post_ids):
+            calls.append(set(post_ids))
+            if len(calls) == 1:
+                # Правка из другого запроса, пока пачка переиндексируется
+                SearchQueueEntry.objects.create(post_id=post.pk)
+            index_posts(post_ids)
+
+        with mock.patch('posts.search.index_posts', edit_while_indexing):
+            flush_queue()
+        self.assertEqual(calls, [{post.pk}, {post.pk}])
+        self.assertFalse(SearchQueueEntry.objects.exists())
+
+    def test_rebuild_command(self):
+        posts = self.create_posts(5, text='Осенний лес')
+        Post.objects.bulk_create(
+            Post(text='Зимний лес', author=self.author) for _ in range(3)
+        )
+        SearchTerm.objects.all().delete()
+        for workers in (0, 2):
+            with self.subTest(workers=workers):
+                out = StringIO()
+                call_command(
+                    'rebuild_search_index',
+                    batch_size=2, workers=workers, stdout=out
+                )
+                self.assertIn('8', out.getvalue())
+                self.assertEqual(search_posts('лес').count(), 8)
+                self.assertEqual(set(search_posts('осень')), set(posts))
+        self.assertFalse(SearchQueueEntry.objects.exists())
@@ -0,0 +1,80 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.db.models import Count, F
+from django.test import TestCase
+
+from posts.models import (Comment, Follow, Mention, Post, PostTag,
+                          SearchTerm, Tag, TimelineEntry, UserStats)
+
+
+def seed(**options):
+    options = {
+        'users': 30, 'groups': 3, 'posts': 120, 'comments': 60,
+        'follows': 80, 'batch_size': 25, 'seed': 1, 'stdout': StringIO(),
+        **options,
+    }
+    call_command('seed_yatube', **options)
+
+
+def snapshot():
+    return list(Post.objects.order_by('pk').values_list(
+        'text', 'author__username', 'group__slug'
+    ))
+
+
+class SeedYatubeTest(TestCase):
+    def test_volumes(self):
+        seed()
+        self.assertEqual(Post.objects.count(), 120)
+        self.assertEqual(Comment.objects.count(), 60)
+        self.assertTrue(Follow.objects.exists())
+        self.assertFalse(Follow.objects.filter(
+            user_id=F('author_id')
+        ).exists())
+
+    def test_derived_data_matches_rows(self):
+        seed()
+        for stats in UserStats.objects.all():
+            with self.subTest(user=stats.user_id):
+                self.assertEqual(
+                    stats.posts_count,
+                    Post.objects.filter(author_id=stats.user_id).count()
+                )
+                self.assertEqual(
+                    stats.followers_count,
+                    Follow.objects.filter(author_id=stats.user_id).count()
+                )
+        self.assertEqual(TimelineEntry.objects.count(), sum(
+            Post.objects.filter(author_id=follow.author_id).count()
+            for follow in Follow.objects.all()
+        ))
+        self.assertTrue(SearchTerm.objects.exists())
+        self.assertFalse(
+            Post.objects.filter(search_terms__isnull=True).exists()
+        )
+        for tag in Tag.objects.annotate(linked=Count('post_tags')):
+            self.assertEqual(tag.posts_count, tag.linked)
+        self.assertEqual(
+            PostTag.objects.count(),
+            Post.objects.filter(text__contains='#').count()
+        )
+        self.assertEqual(
+            Mention.objects.count(),
+            Post.objects.filter(text__contains='@').count()
+        )
+
+    def test_same_seed_same_data(self):
+        with transaction.atomic():
+            seed()
+            first = snapshot()
+            transaction.set_rollback(True)
+        seed()
+        self.assertEqual(snapshot(), first)
+
+    def test_existing_prefix(self):
+        seed(posts=0, comments=0, follows=0)
+        with self.assertRaises(CommandError):
+            seed()
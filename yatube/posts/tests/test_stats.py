@@ -0,0 +1,50 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Comment, Follow, Post, UserStats
+from posts.stats import stats_for
+
+User = get_user_model()
+
+
+class UserStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_user')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def assertStats(self, user, **expected):
+        stats = UserStats.objects.get(user=user)
+        for field, value in expected.items():
+            with self.subTest(field=field):
+                self.assertEqual(getattr(stats, field), value)
+
+    def test_stats_follow_writes(self):
+        stats_for(self.author.pk)
+        stats_for(self.reader.pk)
+        post = Post.objects.create(text='Text', author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='Hi')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertStats(self.author, posts_count=1, followers_count=1)
+        self.assertStats(self.reader, comments_count=1, following_count=1)
+        post.delete()
+        Follow.objects.all().delete()
+        self.assertStats(self.author, posts_count=0, followers_count=0)
+        self.assertStats(self.reader, comments_count=0, following_count=0)
+
+    def test_missing_row_is_counted_on_read(self):
+        Post.objects.create(text='Text', author=self.author)
+        self.assertFalse(UserStats.objects.filter(user=self.author))
+        self.assertEqual(stats_for(self.author.pk).posts_count, 1)
+
+    def test_recount_stats_repairs_drift(self):
+        Post.objects.create(text='Text', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserStats.objects.update(posts_count=7, following_count=-3)
+        call_command('recount_stats', batch_size=1, stdout=StringIO())
+        self.assertStats(self.author, posts_count=1, followers_count=1)
+        self.assertStats(self.reader, posts_count=0, following_count=1)
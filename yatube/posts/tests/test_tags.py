@@ -0,0 +1,111 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Mention, Post, Tag
+from posts.tags import extract_mentions, extract_tags
+
+User = get_user_model()
+
+
+class ExtractTest(TestCase):
+    def test_tags(self):
+        self.assertEqual(
+            extract_tags('#Django и #ёлка, но не a#b и не &#39;'),
+            {'django', 'елка'}
+        )
+
+    def test_mentions(self):
+        self.assertEqual(
+            extract_mentions('Привет, @leo. Пиши на leo@mail.ru, @ann_1!'),
+            {'leo', 'ann_1'}
+        )
+
+
+class TagsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def create_post(self, text):
+        return Post.objects.create(text=text, author=self.author)
+
+    def count(self, name):
+        return Tag.objects.get(name=name).posts_count
+
+    def test_counts_follow_edits_and_deletes(self):
+        first = self.create_post('#python и #django')
+        self.create_post('Снова #python')
+        self.assertEqual(self.count('python'), 2)
+        self.assertEqual(self.count('django'), 1)
+        first.text = 'Только #django и #web'
+        first.save()
+        self.assertEqual(self.count('python'), 1)
+        self.assertEqual(self.count('web'), 1)
+        first.save()
+        self.assertEqual(self.count('django'), 1)
+        Post.objects.filter(pk=first.pk).delete()
+        self.assertEqual(self.count('django'), 0)
+        self.assertEqual(self.count('python'), 1)
+
+    def test_tag_page(self):
+        tagged = self.create_post('Про #Django')
+        self.create_post('Без тегов')
+        response = self.client.get(
+            reverse('posts:tag_posts', kwargs={'name': 'DJANGO'})
+        )
+        self.assertEqual(list(response.context['page_obj']), [tagged])
+        self.assertEqual(response.context['tag'].posts_count, 1)
+        # Число страниц берётся из posts_count, а не из COUNT по связям
+        Tag.objects.filter(name='django').update(posts_count=25)
+        response = self.client.get(
+            reverse('posts:tag_posts', kwargs={'name': 'django'})
+        )
+        self.assertEqual(response.context['page_obj'].paginator.count, 25)
+        self.assertEqual(
+            self.client.get(
+                reverse('posts:tag_posts', kwargs={'name': 'missing'})
+            ).status_code,
+            404
+        )
+
+    def test_mentions_feed(self):
+        mention = self.create_post('Спасибо @reader и @nobody')
+        self.create_post('Просто пост')
+        self.assertEqual(
+            list(Mention.objects.values_list('user__username', flat=True)),
+            ['reader']
+        )
+        response = self.client.get(
+            reverse('posts:profile_mentions', kwargs={'username': 'reader'})
+        )
+        self.assertEqual(list(response.context['page_obj']), [mention])
+        mention.text = 'Спасибо всем'
+        mention.save()
+        self.assertFalse(Mention.objects.exists())
+
+    def test_text_links(self):
+        post = self.create_post(
+            'Читайте #новости от @reader и @nobody <b>'
+        )
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertContains(
+            response,
+            '<a href="{}">#новости</a>'.format(
+                reverse('posts:tag_posts', args=['новости'])
+            )
+        )
+        self.assertContains(
+            response,
+            '<a href="{}">@reader</a>'.format(
+                reverse('posts:profile', args=['reader'])
+            )
+        )
+        self.assertContains(response, '&lt;b&gt;')
+        self.assertNotContains(
+            response, reverse('posts:profile', args=['nobody'])
+        )
@@ -0,0 +1,142 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import CelebrityAuthor, Follow, Post, TimelineEntry
+from posts.views import POSTS_ON_VIEW
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='test_user')
+        cls.stranger = User.objects.create_user(username='stranger')
+        cls.old_post = Post.objects.create(text='Old', author=cls.author)
+        Post.objects.create(text='Foreign', author=cls.stranger)
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def timeline(self):
+        return list(
+            self.client.get(reverse('posts:follow_index')).context['page_obj']
+        )
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.timeline(), [self.old_post])
+        Follow.objects.filter(user=self.reader, author=self.author).delete()
+        self.assertEqual(self.timeline(), [])
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader))
+
+    def test_new_post_fans_out_to_followers(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='New', author=self.author)
+        self.assertEqual(self.timeline(), [post, self.old_post])
+        self.assertEqual(
+            TimelineEntry.objects.get(user=self.reader, post=post).pub_date,
+            post.pub_date
+        )
+
+    def test_feed_reads_materialized_entries(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        TimelineEntry.objects.filter(post=self.old_post).delete()
+        self.assertEqual(self.timeline(), [])
+
+    def test_cursor_pages_break_ties_by_post(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        for i in range(POSTS_ON_VIEW):
+            Post.objects.create(text='Post {}'.format(i), author=self.author)
+        # Одинаковая дата у всех: порядок держится только на id поста
+        Post.objects.update(pub_date=self.old_post.pub_date)
+        TimelineEntry.objects.update(pub_date=self.old_post.pub_date)
+        expected = list(
+            Post.objects.filter(author=self.author).order_by('-pk')
+        )
+        url = reverse('posts:follow_index')
+        first = self.client.get(url + '?cursor=').context['page_obj']
+        second = self.client.get(
+            url + '?cursor=' + first.next_cursor
+        ).context['page_obj']
+        self.assertEqual(list(first) + list(second), expected)
+        self.assertFalse(second.has_next())
+        back = self.client.get(
+            url + '?cursor=' + second.previous_cursor
+        ).context['page_obj']
+        self.assertEqual(list(back), list(first))
+
+
+@override_settings(TIMELINE_FANOUT_THRESHOLD=2)
+class HybridTimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.fan = User.objects.create_user(username='fan')
+        cls.author = User.objects.create_user(username='test_user')
+        cls.old_post = Post.objects.create(text='Old', author=cls.author)
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.fan, author=self.author)
+
+    def timeline(self):
+        return list(
+            self.client.get(reverse('posts:follow_index')).context['page_obj']
+        )
+
+    def test_celebrity_posts_are_merged_on_read(self):
+        self.assertTrue(CelebrityAuthor.objects.filter(author=self.author))
+        post = Post.objects.create(text='New', author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post))
+        self.assertEqual(self.timeline(), [post, self.old_post])
+
+    def test_demoted_author_is_backfilled(self):
+        post = Post.objects.create(text='New', author=self.author)
+        Follow.objects.filter(user=self.fan).delete()
+        self.assertFalse(CelebrityAuthor.objects.filter(author=self.author))
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post)
+        )
+        self.assertEqual(self.timeline(), [post, self.old_post])
+
+    def test_pages_interleave_entries_and_celebrity_posts(self):
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.reader, author=other)
+        for i in range(POSTS_ON_VIEW // 2 + 1):
+            Post.objects.create(text='Popular', author=self.author)
+            Post.objects.create(text='Other', author=other)
+        expected = list(Post.objects.order_by('-pub_date', '-pk'))
+        url = reverse('posts:follow_index')
+        # Старая запись популярного автора не даёт повтора
+        self.assertTrue(TimelineEntry.objects.filter(post=self.old_post))
+        for query in ('?page=', '?cursor='):
+            with self.subTest(query=query):
+                first = self.client.get(url + query).context['page_obj']
+                following = (
+                    first.next_cursor if query == '?cursor='
+                    else first.next_page_number()
+                )
+                second = self.client.get(
+                    url + query + str(following)
+                ).context['page_obj']
+                self.assertEqual(list(first) + list(second), expected)
+                self.assertFalse(second.has_next())
+        back = self.client.get(
+            url + '?cursor=' + second.previous_cursor
+        ).context['page_obj']
+        self.assertEqual(list(back), expected[:POSTS_ON_VIEW])
+
+    @override_settings(TIMELINE_DEMOTE_RATIO=0.5)
+    def test_author_near_threshold_stays_celebrity(self):
+        Follow.objects.filter(user=self.fan).delete()
+        self.assertTrue(CelebrityAuthor.objects.filter(author=self.author))
+        post = Post.objects.create(text='New', author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post))
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertFalse(CelebrityAuthor.objects.filter(author=self.author))
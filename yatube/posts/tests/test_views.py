@@ -2,8 +2,8 @@ import shutil
 import tempfile
 import time
 
+from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.core.cache import cache
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.test import TestCase, Client, override_settings
@@ -11,6 +11,7 @@ from django.urls import reverse
 from django import forms
 
 from posts.models import Post, Group, Follow
+from posts.storage import ContentHashStorage
 from posts.views import POSTS_ON_VIEW
 
 User = get_user_model()
@@ -42,6 +43,9 @@ class ViewsTest(TestCase):
             b'\x02\x00\x01\x00\x00\x02\x02\x0C'
             b'\x0A\x00\x3B'
         )
+        cls.image_name = ContentHashStorage.hashed_name(
+            'posts/small.jpg', ContentFile(cls.small_jpg)
+        )
         cls.uploaded = SimpleUploadedFile(
             name='small.jpg',
             content=cls.small_jpg,
@@ -198,13 +202,13 @@ class ViewsTest(TestCase):
             getattr(self.test_post_author.get(
                 reverse('posts:index')
             ).context['page_obj'][0], 'image'),
-            'posts/small.jpg'
+            self.image_name
         )
         self.assertEqual(
             getattr(self.test_post_author.get(
                 reverse('posts:group_posts', kwargs={'slug': self.group.slug})
             ).context['page_obj'][0], 'image'),
-            'posts/small.jpg'
+            self.image_name
         )
         self.assertEqual(
             getattr(self.test_post_author.get(
@@ -213,7 +217,7 @@ class ViewsTest(TestCase):
                     kwargs={'username': self.author.username}
                 )
             ).context['page_obj'][0], 'image'),
-            'posts/small.jpg'
+            self.image_name
         )
         self.assertEqual(
             getattr(self.test_post_author.get(
@@ -222,7 +226,7 @@ class ViewsTest(TestCase):
                     kwargs={'post_id': self.post.pk}
                 )
             ).context['post'], 'image'),
-            'posts/small.jpg'
+            self.image_name
         )
 
     def test_post_in_pages(self):
@@ -297,14 +301,14 @@ class ViewsTest(TestCase):
         content_with_post = self.test_post_author.get(
             reverse('posts:index')
         ).content
-        post.delete()
+        Post.objects.filter(pk=post.pk).update(text='Changed text')
         self.assertEqual(
             content_with_post,
             self.test_post_author.get(
                 reverse('posts:index')
             ).content
         )
-        cache.clear()
+        post.delete()
         self.assertNotEqual(
             content_with_post,
             self.test_post_author.get(
@@ -312,6 +316,22 @@ class ViewsTest(TestCase):
             ).content
         )
 
+    def test_index_cache_is_scoped(self):
+        first_page = self.test_post_author.get(reverse('posts:index')).content
+        self.assertNotEqual(
+            first_page,
+            self.test_post_author.get(
+                reverse('posts:index') + '?page=2'
+            ).content
+        )
+        self.assertNotIn(
+            'Избранные авторы',
+            self.guest_client.get(
+                reverse('posts:index')
+            ).content.decode()
+        )
+        self.assertIn('Избранные авторы', first_page.decode())
+
     def test_authenticated_user_can_follow(self):
         self.assertRedirects(
             self.authorized_client.get(
@@ -358,6 +378,41 @@ class ViewsTest(TestCase):
             ).exists()
         )
 
+    def test_follow_toggle_returns_json(self):
+        url = reverse(
+            'posts:profile_follow_toggle',
+            kwargs={'username': self.author.username}
+        )
+        self.assertEqual(self.authorized_client.get(url).status_code, 405)
+        response = self.authorized_client.post(url)
+        self.assertEqual(response.json(), {'following': True})
+        self.assertTrue(
+            Follow.objects.filter(user=self.user, author=self.author).exists()
+        )
+        response = self.authorized_client.post(url)
+        self.assertEqual(response.json(), {'following': False})
+        self.assertFalse(
+            Follow.objects.filter(user=self.user, author=self.author).exists()
+        )
+        self.assertEqual(self.test_post_author.post(url).status_code, 400)
+
+    def test_follow_toggle_knows_both_fallback_urls(self):
+        response = self.authorized_client.get(
+            reverse('posts:profile', kwargs={'username': self.author.username})
+        )
+        for name in ('posts:profile_follow', 'posts:profile_unfollow'):
+            with self.subTest(name=name):
+                self.assertContains(response, 'data-{}-url="{}"'.format(
+                    name.split('_')[-1],
+                    reverse(name, kwargs={'username': self.author.username})
+                ))
+
+    def test_follow_page_cache_is_per_user(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        url = reverse('posts:follow_index')
+        self.assertContains(self.authorized_client.get(url), self.post.text)
+        self.assertNotContains(self.test_post_author.get(url), self.post.text)
+
     def test_new_post_appears_in_follow_index(self):
         self.assertFalse(
             Follow.objects.filter(
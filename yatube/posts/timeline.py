@@ -0,0 +1,276 @@
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import F, Q
+from django.utils.functional import cached_property
+
+from .models import CelebrityAuthor, Follow, Post, TimelineEntry
+from .paginators import CursorPaginator
+from .stats import stats_for
+
+TIMELINE_BATCH_SIZE = 1000
+
+
+def _insert(entries):
+    # Порциями, чтобы не держать в памяти записи для всех подписчиков;
+    # размер одного INSERT Django подбирает сам под ограничения СУБД
+    entries = iter(entries)
+    batch = list(islice(entries, TIMELINE_BATCH_SIZE))
+    while batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        batch = list(islice(entries, TIMELINE_BATCH_SIZE))
+
+
+def is_celebrity(author_id):
+    return CelebrityAuthor.objects.filter(author_id=author_id).exists()
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам всех подписчиков автора."""
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту читателя уже опубликованные посты автора."""
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('pk', 'pub_date')
+    _insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def fan_out_author(author_id):
+    """
+    Раскладывает все посты автора по лентам всех его подписчиков
+    одним INSERT ... SELECT, не перекладывая строки через Python.
+    """
+    entry, post, follow = (
+        model._meta for model in (TimelineEntry, Post, Follow)
+    )
+    ops = connection.ops
+    sql = (
+        '{insert} {entries} ({user}, {post}, {author}, {date}) '
+        'SELECT follow.{follow_user}, post.{post_id}, post.{post_author}, '
+        'post.{post_date} FROM {follows} follow '
+        'INNER JOIN {posts} post '
+        'ON post.{post_author} = follow.{follow_author} '
+        'WHERE follow.{follow_author} = %s {suffix}'
+    ).format(
+        insert=ops.insert_statement(ignore_conflicts=True),
+        entries=ops.quote_name(entry.db_table),
+        user=ops.quote_name(entry.get_field('user').column),
+        post=ops.quote_name(entry.get_field('post').column),
+        author=ops.quote_name(entry.get_field('author').column),
+        date=ops.quote_name(entry.get_field('pub_date').column),
+        follows=ops.quote_name(follow.db_table),
+        follow_user=ops.quote_name(follow.get_field('user').column),
+        follow_author=ops.quote_name(follow.get_field('author').column),
+        posts=ops.quote_name(post.db_table),
+        post_id=ops.quote_name(post.pk.column),
+        post_author=ops.quote_name(post.get_field('author').column),
+        post_date=ops.quote_name(post.get_field('pub_date').column),
+        suffix=ops.ignore_conflicts_suffix_sql(ignore_conflicts=True),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [author_id])
+
+
+def prune(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def update_celebrity(author_id):
+    """
+    Переводит автора между раскладкой при записи и подмешиванием.
+
+    Обратно в раскладку автор переходит, только опустившись ниже
+    TIMELINE_DEMOTE_RATIO от порога: иначе автор у самого порога
+    перекладывал бы все ленты на каждой подписке и отписке.
+    """
+    count = stats_for(author_id).followers_count
+    threshold = settings.TIMELINE_FANOUT_THRESHOLD
+    if count >= threshold:
+        CelebrityAuthor.objects.get_or_create(author_id=author_id)
+    elif (
+        count < threshold * settings.TIMELINE_DEMOTE_RATIO
+        and CelebrityAuthor.objects.filter(author_id=author_id).delete()[0]
+    ):
+        # Пока автор был популярным, его посты не попадали в ленты
+        fan_out_author(author_id)
+
+
+def follow_added(user_id, author_id):
+    update_celebrity(author_id)
+    if not is_celebrity(author_id):
+        backfill(user_id, author_id)
+
+
+def follow_removed(user_id, author_id):
+    prune(user_id, author_id)
+    update_celebrity(author_id)
+
+
+def followed_celebrities(user):
+    return Follow.objects.filter(
+        user=user,
+        author__celebrity__isnull=False
+    ).values('author')
+
+
+def _after(values, reverse, date, pk):
+    """
+    Ключи строго после курсора. Отдельная граница по дате даёт СУБД
+    диапазон индекса вместо просмотра ленты с самого начала.
+    """
+    lookup, edge = ('gt', 'gte') if reverse else ('lt', 'lte')
+    return Q(**{'{}__{}'.format(date, edge): values[0]}) & (
+        Q(**{'{}__{}'.format(date, lookup): values[0]})
+        | Q(**{'{}__{}'.format(pk, lookup): values[1]})
+    )
+
+
+def _keys(queryset, pk, limit, values, reverse):
+    """Не больше limit ключей (pub_date, id поста) после курсора."""
+    if values is not None:
+        queryset = queryset.filter(_after(values, reverse, 'pub_date', pk))
+    ordering = ('pub_date', pk) if reverse else ('-pub_date', '-' + pk)
+    return queryset.order_by(*ordering).values_list('pub_date', pk)[:limit]
+
+
+class Timeline:
+    """
+    Лента подписок читателя для Paginator (count и срезы)
+    и TimelinePaginator.
+
+    Без популярных авторов лента — это записи TimelineEntry: условия
+    и сортировка стоят на её колонках, и страницу выбирает индекс
+    (user, -pub_date, -post) без сортировки всей ленты.
+
+    С популярными авторами каждый источник — записи ленты и посты
+    каждого такого автора по post_author_pub_date — отдаёт не больше
+    строк, чем нужно странице, а UNION ALL сливает эти ключи. Посты
+    страницы подгружаются потом по pk. Вторым ключом везде служит
+    id поста, поэтому курсор общий для всех источников.
+    """
+
+    model = Post
+
+    def __init__(self, user, celebrities=None):
+        self.user = user
+        if celebrities is not None:
+            self.celebrities = list(celebrities)
+
+    @cached_property
+    def celebrities(self):
+        return list(
+            followed_celebrities(self.user).values_list('author', flat=True)
+        )
+
+    def entries(self, values=None, reverse=False):
+        condition = Q(timeline_entries__user=self.user)
+        if values is not None:
+            condition &= _after(
+                values, reverse,
+                'timeline_entries__pub_date', 'timeline_entries__post'
+            )
+        # F(), а не имя поля: по имени внешнего ключа Django сортировал
+        # бы по Meta.ordering поста и терял индекс
+        ordering = [
+            F('timeline_entries__pub_date'), F('timeline_entries__post')
+        ]
+        ordering = [
+            field.asc() if reverse else field.desc() for field in ordering
+        ]
+        # Все условия одним filter(): иначе у каждого было бы своё
+        # соединение с записями ленты
+        return Post.objects.for_feed().filter(condition).order_by(*ordering)
+
+    def timeline_entries(self):
+        # Записи, оставшиеся от времени, когда автор ещё не был
+        # популярным, уже есть в источнике его постов
+        return TimelineEntry.objects.filter(user=self.user).exclude(
+            author_id__in=self.celebrities
+        )
+
+    def sources(self, limit, values=None, reverse=False):
+        return [
+            _keys(self.timeline_entries(), 'post_id', limit, values, reverse)
+        ] + [
+            _keys(
+                Post.objects.filter(author_id=author_id),
+                'pk', limit, values, reverse
+            )
+            for author_id in self.celebrities
+        ]
+
+    def keys(self, start, stop, values=None, reverse=False):
+        """id постов [start:stop] слитой ленты после курсора."""
+        sources = self.sources(stop, values, reverse)
+        parts, params = [], []
+        for number, queryset in enumerate(sources):
+            sql, source_params = queryset.query.get_compiler(
+                queryset.db
+            ).as_sql()
+            parts.append('SELECT * FROM ({}) source_{}'.format(sql, number))
+            params.extend(source_params)
+        sql = '{} ORDER BY 1 {order}, 2 {order} LIMIT %s OFFSET %s'.format(
+            ' UNION ALL '.join(parts),
+            order='ASC' if reverse else 'DESC',
+        )
+        with connections[sources[0].db].cursor() as cursor:
+            cursor.execute(sql, params + [stop - start, start])
+            return [pk for pub_date, pk in cursor.fetchall()]
+
+    @staticmethod
+    def load(ids):
+        posts = Post.objects.for_feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+    def fetch(self, limit, values=None, reverse=False):
+        if not self.celebrities:
+            return list(self.entries(values, reverse)[:limit])
+        return self.load(self.keys(0, limit, values, reverse))
+
+    def count(self):
+        if not self.celebrities:
+            return TimelineEntry.objects.filter(user=self.user).count()
+        return self.timeline_entries().count() + Post.objects.filter(
+            author_id__in=self.celebrities
+        ).count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        # Paginator выбирает страницу срезом [bottom:top]
+        if not self.celebrities:
+            return list(self.entries()[index])
+        return self.load(self.keys(index.start, index.stop))
+
+
+class TimelinePaginator(CursorPaginator):
+    """Курсорная пагинация ленты подписок по ключам Timeline."""
+
+    def fetch(self, values, reverse):
+        return self.object_list.fetch(self.per_page + 1, values, reverse)
@@ -1,25 +1,65 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.core.paginator import Paginator
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.http import urlencode
+from django.views.decorators.http import require_POST
 
+from .counters import ALL_POSTS, CountedPaginator, author_key, group_key
+from .feed_cache import FEED_CACHE_TIMEOUT, feed_version
 from .forms import PostForm, CommentForm
-from .models import Group, Post, Follow
+from .models import Comment, Group, Post, Follow, Tag
+from .paginators import CursorPaginator
+from .search import search_posts
+from .stats import stats_for, user_stats
+from .tags import mentioning_posts, normalize_tag, tagged_posts
+from .timeline import Timeline, TimelinePaginator
 
 
 POSTS_ON_VIEW: int = 10
+COMMENTS_ON_VIEW: int = 20
 
 
-def paginator(request, posts):
-    return Paginator(posts, POSTS_ON_VIEW).get_page(request.GET.get('page'))
+def paginator(request, posts, count_key=None, known_count=None,
+              cursor_paginator=CursorPaginator):
+    if settings.POSTS_CURSOR_PAGINATION or 'cursor' in request.GET:
+        return cursor_paginator(posts, POSTS_ON_VIEW).get_page(
+            request.GET.get('cursor')
+        )
+    if count_key is None and known_count is None:
+        pages = Paginator(posts, POSTS_ON_VIEW)
+    else:
+        pages = CountedPaginator(
+            posts, POSTS_ON_VIEW, count_key, known_count
+        )
+    return pages.get_page(request.GET.get('page'))
 
 
 def index(request):
     return render(request, 'posts/index.html', {
         'page_obj': paginator(
             request,
-            Post.objects.select_related('group').all()
+            Post.objects.for_feed(),
+            ALL_POSTS
         ),
+        'feed_version': feed_version(),
+        'feed_cache_timeout': FEED_CACHE_TIMEOUT,
+    })
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = CursorPaginator(
+        search_posts(query).for_feed(),
+        POSTS_ON_VIEW,
+        ordering=('-rank', '-pk')
+    ).get_page(request.GET.get('cursor'))
+    return render(request, 'posts/search.html', {
+        'query': query,
+        'page_obj': page_obj,
+        'page_params': urlencode({'q': query}) + '&',
     })
 
 
@@ -27,31 +67,95 @@ def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     return render(request, 'posts/group_list.html', {
         'group': group,
-        'page_obj': paginator(request, group.posts.all()),
+        'page_obj': paginator(
+            request,
+            group.posts.for_feed(),
+            group_key(group.pk)
+        ),
     })
 
 
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    following: bool = False
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            user=request.user,
-            author=get_object_or_404(User, username=username)
-        ).exists()
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username
+    )
+    following: bool = (
+        request.user.is_authenticated
+        and Follow.objects.filter(user=request.user, author=author).exists()
+    )
     return render(request, 'posts/profile.html', {
-        'page_obj': paginator(request, author.posts.all()),
+        'page_obj': paginator(
+            request,
+            author.posts.for_feed(),
+            author_key(author.pk)
+        ),
         'author': author,
+        'author_stats': user_stats(author),
         'following': following
     })
 
 
+def tag_posts(request, name):
+    tag = get_object_or_404(Tag, name=normalize_tag(name))
+    return render(request, 'posts/tag_list.html', {
+        'tag': tag,
+        'page_obj': paginator(
+            request,
+            tagged_posts(tag),
+            known_count=tag.posts_count
+        ),
+    })
+
+
+def profile_mentions(request, username):
+    author = get_object_or_404(User, username=username)
+    return render(request, 'posts/mentions.html', {
+        'author': author,
+        'page_obj': paginator(request, mentioning_posts(author)),
+    })
+
+
+def comments_page(request, post_id):
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    ).only('text', 'created', 'post_id', 'author__username')
+    return CursorPaginator(
+        comments,
+        COMMENTS_ON_VIEW,
+        ordering=('created', 'pk')
+    ).get_page(request.GET.get('comments'))
+
+
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post.objects.for_feed(), pk=post_id)
     return render(request, 'posts/post_detail.html', {
         'post': post,
+        'author_stats': stats_for(post.author_id),
         'form': CommentForm(request.POST or None),
-        'comments': post.comments.all()
+        'comments': comments_page(request, post_id),
+    })
+
+
+def post_comments(request, post_id):
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = comments_page(request, post_id)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created.isoformat(),
+                }
+                for comment in comments
+            ],
+            'next': comments.next_cursor,
+        })
+    return render(request, 'posts/includes/comments.html', {
+        'post_id': post_id,
+        'comments': comments,
     })
 
 
@@ -101,39 +205,42 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    following = Follow.objects.filter(
-        user=request.user
-    ).values_list('author', flat=True)
     return render(request, 'posts/follow.html', {
         'page_obj': paginator(
             request,
-            Post.objects.filter(author__in=following)
+            Timeline(request.user),
+            cursor_paginator=TimelinePaginator
         ),
     })
 
 
 @login_required
 def profile_follow(request, username):
-    if request.user == get_object_or_404(User, username=username):
-        return redirect('posts:profile', username)
-    if Follow.objects.filter(
-        user=request.user,
-        author=get_object_or_404(User, username=username)
-    ).exists():
-        return redirect('posts:profile', username)
-    Follow.objects.create(
-        user=request.user,
-        author=get_object_or_404(User, username=username)
-    )
+    author = get_object_or_404(User, username=username)
+    if request.user != author:
+        Follow.objects.get_or_create(user=request.user, author=author)
     return redirect('posts:profile', username)
 
 
 @login_required
 def profile_unfollow(request, username):
-    if request.user == get_object_or_404(User, username=username):
-        return redirect('posts:profile', username)
     Follow.objects.filter(
         user=request.user,
-        author=get_object_or_404(User, username=username)
+        author__username=username
     ).delete()
     return redirect('posts:profile', username)
+
+
+@login_required
+@require_POST
+def profile_follow_toggle(request, username):
+    author = get_object_or_404(User, username=username)
+    if request.user == author:
+        return JsonResponse({'following': False}, status=400)
+    deleted, _ = Follow.objects.filter(
+        user=request.user,
+        author=author
+    ).delete()
+    if not deleted:
+        Follow.objects.get_or_create(user=request.user, author=author)
+    return JsonResponse({'following': not deleted})
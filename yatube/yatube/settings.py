@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 SECRET_KEY = os.getenv('SECRET_KEY", default="SUP3R-S3CR3T-K3Y-F0R-MY-PR0J3CT')
@@ -38,6 +40,15 @@ ALLOWED_HOSTS = [
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
+# Ленты постов листаются по курсору (pub_date, id) вместо номера страницы
+POSTS_CURSOR_PAGINATION = False
+
+# Посты авторов с таким числом подписчиков не раскладываются по лентам
+# при публикации, а подмешиваются в ленту подписок при чтении
+TIMELINE_FANOUT_THRESHOLD = 10000
+# Обратно в раскладку автор переходит ниже этой доли порога
+TIMELINE_DEMOTE_RATIO = 0.8
+
 
 #  подключаем движок filebased.EmailBackend
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
@@ -61,6 +72,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentationMiddleware',
+    'core.middleware.QueryDetectorMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -75,7 +89,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.InstrumentedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -96,13 +110,63 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# Профиль базы выбирается переменной окружения YATUBE_DB
+DB_PROFILE = os.getenv('YATUBE_DB', 'sqlite')
+# Сколько секунд соединение переживает между запросами; 0 — закрывать сразу
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', 60))
+
+DATABASE_PROFILES = {
+    'sqlite': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        'NAME': os.getenv('DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+    },
+    'postgresql': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.getenv('DB_NAME', 'yatube'),
+        'USER': os.getenv('DB_USER', 'yatube'),
+        'PASSWORD': os.getenv('DB_PASSWORD', ''),
+        'HOST': os.getenv('DB_HOST', 'localhost'),
+        'PORT': os.getenv('DB_PORT', '5432'),
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+    },
 }
 
+DATABASES = {
+    'default': DATABASE_PROFILES[DB_PROFILE],
+}
+# Реплики только для чтения: хосты через запятую, остальное как у default.
+# Только для профиля postgresql: у SQLite нет HOST, и «реплика» оказалась
+# бы тем же файлом
+DB_REPLICA_HOSTS = [
+    host for host in os.getenv('DB_REPLICA_HOSTS', '').split(',') if host
+]
+if DB_REPLICA_HOSTS and DB_PROFILE != 'postgresql':
+    raise ImproperlyConfigured(
+        'DB_REPLICA_HOSTS задаётся только с YATUBE_DB=postgresql.'
+    )
+for number, host in enumerate(DB_REPLICA_HOSTS, 1):
+    DATABASES['replica_{}'.format(number)] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Представления, которые читают с реплик, и сколько секунд после записи
+# браузер читает только основную базу
+REPLICA_READ_VIEWS = (
+    'index', 'group_posts', 'profile', 'post_detail', 'follow_index',
+)
+REPLICA_STICKY_SECONDS = 5
+
+# Выполняются при каждом новом соединении с SQLite
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,
+}
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -146,9 +210,65 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Варианты картинки поста для srcset: ширины, пропорции кадра и форматы
+# в порядке предпочтения. Форматы, которые не умеет сохранять установленный
+# Pillow, пропускаются; последний должен поддерживаться везде
+POST_IMAGE_WIDTHS = (320, 640, 960)
+POST_IMAGE_RATIO = (960, 339)
+POST_IMAGE_FORMATS = ('AVIF', 'WEBP', 'JPEG')
+# Загруженные картинки уменьшаются до этой длины большей стороны
+# и перекодируются без EXIF
+POST_IMAGE_MAX_SIDE = 1920
+POST_IMAGE_QUALITY = 85
+# 0 — строить миниатюры в том же потоке после коммита
+THUMBNAIL_WORKERS = 2
+
+# Сколько постов из очереди поиска переиндексируется за одну транзакцию
+SEARCH_INDEX_BATCH_SIZE = 500
+# Выбирая самое редкое слово запроса, поиск считает его посты не дальше
+# этого числа: слова частее уже не станут кандидатами
+SEARCH_TERM_COUNT_LIMIT = 10000
+
+# Кеш в два уровня: короткоживущая копия в памяти каждого воркера поверх
+# общего для всех процессов файлового кеша. Ключи версий и снимки метрик
+# читаются только из общего уровня: сброс версии сразу виден всем
+# воркерам, а /metrics/ видит свежие снимки соседей
+CACHE_LOCATION = os.getenv(
+    'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')
+)
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake'
+        'BACKEND': 'core.cache.InstrumentedCache',
+        'WRAPS': 'core.cache.TieredCache',
+        'SHARED': 'core.cache.FileCache',
+        'LOCATION': CACHE_LOCATION,
+        # FileCache не обходит каталог на каждой записи, как FileBasedCache:
+        # лимит по расписанию соблюдает manage.py cull_cache и выбрасывает
+        # просроченные и самые старые записи, а не треть наугад
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+        'LOCAL': {
+            'MAX_ENTRIES': 1000,
+            'TIMEOUT': 5,
+            'BYPASS': ['feed_version', 'metrics:'],
+        },
     }
 }
+# Тесты держат кеш во временном каталоге: core.testing.TestRunner
+# и плагин tests/fixtures/fixture_cache.py
+TEST_RUNNER = 'core.testing.TestRunner'
+
+# Сколько последних наблюдений хранить для квантилей в /metrics/
+METRICS_WINDOW = 1024
+# Как часто воркер кладёт свои метрики в общий кеш, секунды
+METRICS_PUBLISH_INTERVAL = 10
+# Сколько хранить снимок воркера, который перестал публиковать метрики
+METRICS_WORKER_TIMEOUT = 60 * 60
+# Токен для /metrics/ (Authorization: Bearer …); без него страница выключена.
+# Адрес клиента за прокси не подходит: для приложения все запросы локальные
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+# Поиск N+1, медленных запросов и сортировок без индекса в каждом запросе
+# при DEBUG; находки пишутся в лог core.query_detector
+QUERY_DETECTOR = True
+QUERY_DETECTOR_REPEATS = 5
+QUERY_DETECTOR_SLOW_MS = 100
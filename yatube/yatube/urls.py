@@ -1,12 +1,15 @@
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import metrics
+
 urlpatterns = [
     path('about/', include('about.urls', namespace='about')),
     path('group/slug:slug', include('posts.urls', namespace='group_posts')),
     path('profile/str:username', include('posts.urls', namespace='profile')),
     path('posts/int:post_id', include('posts.urls', namespace='post_detail')),
     path('admin/', admin.site.urls),
+    path('metrics/', metrics, name='metrics'),
     path('auth/', include('users.urls', namespace='user')),
     path('auth/', include('django.contrib.auth.urls')),
     path('', include('posts.urls', namespace='index')),